@@ -1,178 +1,222 @@
 import streamlit as st
-import pandas as pd
 import yaml
 import pathlib
-import subprocess
-import os
-from io import BytesIO
-import openpyxl
+
+from src.build_worker import BuildWorker
+from src.excel_io import make_excel, rebuild_from_excel
+from src.bundle import search_lib_tags, vis_script_tag
+from src.generate_html import TEMPLATE, build as build_html, load_settings, render_html
+from src.file_safety import atomic_write, file_lock
+from src.metrics import from_settings, read_log, stage
+from src.model_diff import apply_diff, diff_models, is_empty, summary
+from src.model_store import ModelStore, sqlite_path
+from src.snapshot import YAML_DUMPER, load_with_hash, remember
+from src.subgraph import cached_extract, make_query, vocabulary
 
 # --------- Пути ---------
 BASE = pathlib.Path(__file__).resolve().parent
 CONFIG_PATH = BASE / "config" / "data_model.yaml"
-GENERATOR = BASE / "src" / "generate_html.py"
 BUILD_HTML = BASE / "build" / "data_model_v1.html"
+STORE_PATH = sqlite_path(load_settings())  # None — модель в YAML; иначе база SQLite (settings.storage)
 
 
-# --------- Работа с YAML ---------
-def load_yaml(path):
-    with open(path, "r", encoding="utf-8") as f:
-        return yaml.safe_load(f)
+# --------- Работа с YAML / SQLite ---------
+def load_model():
+    """
+    (модель, хэш). YAML — из бинарного снимка, разбирается заново, только если
+    изменился; SQLite — из памяти процесса, пока не сменилась ревизия базы.
+    """
+    if STORE_PATH is not None:
+        with ModelStore(STORE_PATH) as store:
+            return store.load_with_hash()
+    return load_with_hash(CONFIG_PATH)
 
 
 def save_yaml(path, data):
-    with open(path, "w", encoding="utf-8") as f:
-        yaml.safe_dump(data, f, allow_unicode=True, sort_keys=False)
-        f.flush()
-        os.fsync(f.fileno())
-
-
-# --------- Генерация HTML ---------
-def generate_html():
-    try:
-        result = subprocess.run(["python", str(GENERATOR)], capture_output=True, text=True)
-        if result.returncode != 0:
-            st.error("❌ Ошибка при генерации HTML:")
-            st.code(result.stderr or result.stdout)
+    """Атомарно пишет YAML и сразу обновляет снимок; возвращает SHA-256 файла."""
+    text = yaml.dump(data, Dumper=YAML_DUMPER, allow_unicode=True, sort_keys=False)
+    atomic_write(path, text)
+    return remember(path, data)
+
+
+# --------- Фоновая сборка ---------
+def apply_uploads(batch):
+    """
+    Задание фонового потока. batch — склеенные заявки (base_hash, new_model, changes):
+    дельты по очереди накладываются на актуальную модель под блокировкой,
+    YAML пишется и HTML собирается один раз на всю пачку. В SQLite
+    дельта пишется по записям, транзакцией на каждую загрузку.
+    """
+    metrics = from_settings("excel_import", load_settings())
+    with file_lock(STORE_PATH or CONFIG_PATH):
+        model, disk_hash = load_model()
+        if STORE_PATH is not None:
+            with stage(metrics, "store_apply") as rec, ModelStore(STORE_PATH) as store:
+                rec["records"] = sum(store.apply_diff(new_model, changes) for _, new_model, changes in batch)
+                model, new_hash = store.load_with_hash()
         else:
-            st.success("✅ HTML успешно сгенерирован.")
-    except Exception as e:
-        st.error(f"⚠️ Не удалось запустить генерацию: {e}")
-
-
-# --------- Универсальная текстовая очистка ---------
-def textify(value):
-    if isinstance(value, dict):
-        return {str(k): textify(v) for k, v in value.items()}
-    if isinstance(value, list):
-        return [textify(v) for v in value]
-    if value is None:
-        return ""
-    return str(value)
-
-
-# --------- Создание Excel-шаблона для всей модели ---------
-def make_excel(data_model: dict) -> BytesIO:
-    buffer = BytesIO()
-    with pd.ExcelWriter(buffer, engine="openpyxl") as writer:
-        # ----- Лист 1: Узлы -----
-        nodes = data_model.get("nodes", [])
-        df_nodes = pd.DataFrame(
-            [
-                {
-                    "name": n.get("name", ""),
-                    "layer": n.get("layer", ""),
-                    "type": n.get("type", ""),
-                    "comment": n.get("comment", ""),
-                }
-                for n in nodes
-            ]
+            for _, new_model, changes in batch:
+                with stage(metrics, "apply_diff"):
+                    model = apply_diff(model, new_model, changes)
+            with stage(metrics, "save_yaml") as rec:
+                new_hash = save_yaml(CONFIG_PATH, model)
+                rec["bytes"] = CONFIG_PATH.stat().st_size
+        # одна дельта от той же модели, что на диске, — генератор пересчитывает только её узлы
+        base_hash, _, changes = batch[0]
+        delta = changes if len(batch) == 1 and base_hash == disk_hash else None
+        rebuilt = build_html(
+            model, load_settings(), output=BUILD_HTML, metrics=metrics,
+            model_hash=new_hash, changes=delta, base_hash=disk_hash, keep_state=True,
         )
-        df_nodes.to_excel(writer, sheet_name="Nodes", index=False)
-
-        # ----- Лист 2: Колонки -----
-        records = []
-        for n in nodes:
-            for col in n.get("columns", []):
-                row = {"node_name": n.get("name", "")}
-                for k, v in col.items():
-                    row[k] = v
-                records.append(row)
-        df_cols = pd.DataFrame(records)
-        df_cols.to_excel(writer, sheet_name="Columns", index=False)
-
-        # ----- Лист 3: Связи -----
-        edges = data_model.get("edges", [])
-        df_edges = pd.DataFrame(edges)
-        df_edges.to_excel(writer, sheet_name="Edges", index=False)
-        # ----- Лист 4: Relations -----
-        relations = data_model.get("relations", [])
-        df_rel = pd.DataFrame(relations)
-        df_rel.to_excel(writer, sheet_name="Relations", index=False)
-        # ----- Лист 4: Relations -----
-        relations = data_model.get("relations", [])
-        if relations:
-            df_rel = pd.DataFrame(relations)
-        else:
-            df_rel = pd.DataFrame(columns=["from", "to", "connection", "process", "comment"])
-        df_rel.to_excel(writer, sheet_name="Relations", index=False)
-
-    buffer.seek(0)
-    return buffer
-
-
-# --------- Сборка YAML из Excel ---------
-def rebuild_from_excel(uploaded_file) -> dict:
-    wb = openpyxl.load_workbook(uploaded_file)
-    data_model = {"nodes": [], "edges": []}
-
-    # --- Узлы ---
-    df_nodes = pd.DataFrame(wb["Nodes"].values)
-    df_nodes.columns = df_nodes.iloc[0]
-    df_nodes = df_nodes.drop(0).fillna("").astype(str)
-
-    # --- Колонки ---
-    if "Columns" in wb.sheetnames:
-        df_cols = pd.DataFrame(wb["Columns"].values)
-        df_cols.columns = df_cols.iloc[0]
-        df_cols = df_cols.drop(0).fillna("").astype(str)
-    else:
-        df_cols = pd.DataFrame(columns=["node_name", "name", "type", "description", "comment"])
-
-    # --- Связи ---
-    if "Edges" in wb.sheetnames:
-        df_edges = pd.DataFrame(wb["Edges"].values)
-        df_edges.columns = df_edges.iloc[0]
-        df_edges = df_edges.drop(0).fillna("").astype(str)
-    else:
-        df_edges = pd.DataFrame(columns=["from", "to", "transfer_type", "data_type", "transfer"])
-    # --- Relations ---
-    if "Relations" in wb.sheetnames:
-        df_rel = pd.DataFrame(wb["Relations"].values)
-        df_rel.columns = df_rel.iloc[0]
-        df_rel = df_rel.drop(0).fillna("").astype(str)
-    else:
-        df_rel = pd.DataFrame(columns=["from", "to", "connection", "process", "comment"])
-
-    # --- Relations ---
-    if "Relations" in wb.sheetnames:
-        df_rel = pd.DataFrame(wb["Relations"].values)
-        df_rel.columns = df_rel.iloc[0]
-        df_rel = df_rel.drop(0).fillna("").astype(str)
-    else:
-        df_rel = pd.DataFrame(columns=["from", "to", "connection", "process", "comment"])
-
-    # --- Формируем узлы с колонками ---
-    for _, n in df_nodes.iterrows():
-        node_name = n["name"]
-        cols_df = df_cols[df_cols["node_name"] == node_name].drop(columns=["node_name"], errors="ignore")
-        node_dict = {
-            "name": node_name,
-            "layer": n.get("layer", ""),
-            "type": n.get("type", ""),
-            "comment": n.get("comment", ""),
-            "columns": textify(cols_df.to_dict(orient="records")),
+    if metrics is not None:
+        metrics.append_to()
+    return f"применено загрузок: {len(batch)}, HTML {'пересобран' if rebuilt else 'актуален'}"
+
+
+@st.cache_resource
+def build_worker():
+    """Один поток сборки на процесс Streamlit, общий для всех сессий."""
+    return BuildWorker(apply_uploads)
+
+
+def build_status():
+    """Статус фоновой сборки; когда заявка этой сессии готова — перерисовываем страницу."""
+    worker = build_worker()
+    status = worker.status()
+    job = st.session_state.get("build_job", 0)
+    error = worker.job_error(job) if job else None
+    if status["done"] < job:
+        st.info(f"⏳ Сборка: {status['state']}, заявок в очереди: {status['queued']}")
+    elif error is not None:
+        st.error("❌ Ваши изменения не применены — ошибка фоновой сборки:")
+        st.code(error)
+    elif status["state"] == "failed":
+        st.warning(f"⚠️ {status['finished_at']}: последняя сборка завершилась ошибкой (не для ваших изменений)")
+    elif status["finished_at"]:
+        st.caption(f"✅ {status['finished_at']}: {status['message']} ({status['seconds']} с)")
+    if job and status["done"] >= job and st.session_state.get("shown_job") != job:
+        st.session_state["shown_job"] = job
+        st.rerun()  # перечитать модель и HTML
+
+
+# опрос статуса раз в секунду без перезапуска всей страницы (Streamlit >= 1.37)
+if hasattr(st, "fragment"):
+    build_status = st.fragment(run_every=1.0)(build_status)
+
+
+# --------- Excel-выгрузка (кэш по хэшу содержимого модели) ---------
+@st.cache_data(max_entries=4, show_spinner=False)
+def excel_bytes(model_hash: str, _data_model: dict) -> bytes:
+    """Байты книги; параметр с "_" Streamlit не хэширует — ключ кэша только model_hash."""
+    metrics = from_settings("excel_export", load_settings())
+    with stage(metrics, "make_excel") as rec:
+        data = make_excel(_data_model).getvalue()
+        rec["bytes"] = len(data)
+    if metrics is not None:
+        metrics.append_to()
+    return data
+
+
+# --------- Дельта из Excel ---------
+def pending_changes(uploaded, data_model, model_hash, metrics=None):
+    """
+    (новая модель, дельта) для загруженного файла. Разбор книги и сравнение
+    держатся в сессии: rerun-ы (в том числе нажатие «Применить») их не повторяют.
+    """
+    key = (uploaded.file_id, model_hash)
+    cached = st.session_state.get("pending_excel")
+    if cached is None or cached[0] != key:
+        with stage(metrics, "rebuild_from_excel") as rec:
+            new_model = rebuild_from_excel(uploaded)
+            rec["bytes"] = uploaded.size
+        with stage(metrics, "diff"):
+            changes = diff_models(data_model, new_model)
+        cached = st.session_state["pending_excel"] = (key, new_model, changes)
+    return cached[1], cached[2]
+
+
+def changes_panel(changes, limit=50):
+    """Сводка изменений и первые ключи по каждому разделу."""
+    st.dataframe(summary(changes), use_container_width=True, hide_index=True)
+    with st.expander("Подробнее", expanded=False):
+        for section, kinds in changes.items():
+            for kind, keys in kinds.items():
+                if keys:
+                    shown = ", ".join(k if isinstance(k, str) else " → ".join(k[:2]) for k in keys[:limit])
+                    more = f" … и ещё {len(keys) - limit}" if len(keys) > limit else ""
+                    st.markdown(f"**{section} / {kind}**: {shown}{more}")
+
+
+# --------- Фрагмент модели ---------
+@st.cache_data(max_entries=2, show_spinner=False)
+def filter_values(model_hash: str, _data_model: dict) -> dict:
+    return vocabulary(_data_model)
+
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def query_html(model_hash: str, query, _data_model: dict):
+    """(HTML фрагмента, узлов, связей) — кэш по хэшу модели и запросу, страница собирается в памяти."""
+    sub = cached_extract(model_hash, _data_model, query)
+    settings = load_settings()
+    assets = (settings.get("build") or {}).get("assets", "cdn")
+    html, _, _ = render_html(
+        sub, settings, TEMPLATE.read_text(encoding="utf-8"),
+        vis_lib=vis_script_tag(assets, BUILD_HTML), search_lib=search_lib_tags(assets, BUILD_HTML),
+    )
+    return html, len(sub["nodes"]), len(sub["edges"]) + len(sub["relations"])
+
+
+def query_controls(model_hash: str, data_model: dict):
+    """Те же параметры, что у generate_html.py --root/--up/--down/--layer/..."""
+    values = filter_values(model_hash, data_model)
+    with st.expander("🔎 Фрагмент модели", expanded=False):
+        c1, c2, c3 = st.columns([2, 1, 1])
+        root = c1.selectbox("Корневой узел", [""] + values["names"], format_func=lambda v: v or "— вся модель —")
+        up = c2.number_input("Шагов вверх", min_value=0, value=2, disabled=not root)
+        down = c3.number_input("Шагов вниз", min_value=0, value=2, disabled=not root)
+        c1, c2, c3, c4 = st.columns(4)
+        layers = c1.multiselect("Слои", values["layers"])
+        types = c2.multiselect("Типы узлов", values["types"])
+        data_types = c3.multiselect("data_type", values["data_types"])
+        transfer_types = c4.multiselect("transfer_type", values["transfer_types"])
+    if not root:
+        up = down = None
+    return make_query(root, up, down, layers, types, data_types, transfer_types)
+
+
+# --------- Панель метрик ---------
+def metrics_panel(limit=20):
+    records = read_log(limit=limit)
+    if not records:
+        st.caption("Журнал пуст. Замеры включаются в config/settings.yaml → metrics.enabled.")
+        return
+    rows = [
+        {
+            "время": r.get("at", ""),
+            "запуск": r.get("run", ""),
+            "этап": s["stage"],
+            "сек": s["seconds"],
+            "пик, MB": s.get("peak_mb"),
+            "байт": s.get("bytes"),
         }
-        data_model["nodes"].append(node_dict)
-        data_model["relations"] = df_rel.to_dict(orient="records")
-    # --- Связи ---
-    for _, e in df_edges.iterrows():
-        e_dict = {str(k): str(v) for k, v in e.items()}
-        data_model["edges"].append(e_dict)
-    data_model["relations"] = df_rel.to_dict(orient="records")
-
-    return data_model
+        for r in reversed(records)
+        for s in r.get("stages", [])
+    ]
+    st.dataframe(rows, use_container_width=True, hide_index=True)
 
 
 # --------- Интерфейс Streamlit ---------
 st.set_page_config(page_title="Data Flow Visualizer Editor", layout="wide")
 st.title("🧩 Data Flow Visualizer — Полная модель данных")
 
-if not CONFIG_PATH.exists():
+if STORE_PATH is not None and not STORE_PATH.exists():
+    st.error(f"❌ База модели не найдена: {STORE_PATH} (python src/model_store.py import)")
+    st.stop()
+if STORE_PATH is None and not CONFIG_PATH.exists():
     st.error(f"❌ Файл YAML не найден: {CONFIG_PATH}")
     st.stop()
 
-data_model = load_yaml(CONFIG_PATH)
+data_model, model_hash = load_model()
 
 # ---------- ВЕРХНИЙ БЛОК ----------
 st.subheader("📥 Экспорт и импорт всей модели")
@@ -182,7 +226,7 @@ col1, col2 = st.columns(2)
 with col1:
     st.download_button(
         label="📤 Скачать всю модель в Excel",
-        data=make_excel(data_model),
+        data=excel_bytes(model_hash, data_model),
         file_name="data_model.xlsx",
         mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
     )
@@ -192,19 +236,39 @@ with col2:
 
     if uploaded is not None:
         try:
-            new_model = rebuild_from_excel(uploaded)
-            save_yaml(CONFIG_PATH, new_model)
-            generate_html()
-            st.success("✅ YAML обновлён и HTML перегенерирован.")
+            metrics = from_settings("excel_import", load_settings())
+            new_model, changes = pending_changes(uploaded, data_model, model_hash, metrics)
+            if is_empty(changes):
+                st.info("ℹ️ Excel совпадает с текущей моделью — изменений нет.")
+            else:
+                changes_panel(changes)
+                if st.session_state.get("build_job", 0) > build_worker().status()["done"]:
+                    st.info("⏳ Изменения отправлены в очередь сборки.")
+                elif st.button("✅ Применить изменения"):
+                    job = build_worker().submit((model_hash, new_model, changes))
+                    st.session_state["build_job"] = job
+                    st.info("⏳ Изменения отправлены в очередь сборки.")
+            if metrics is not None and metrics.stages:
+                metrics.append_to()
         except Exception as e:
             st.error(f"Ошибка при обработке Excel: {e}")
 
+    build_status()
+
+with st.expander("📊 Метрики сборки", expanded=False):
+    metrics_panel()
+
 # ---------- НИЖНИЙ БЛОК ----------
 st.markdown("---")
 st.subheader("🔗 Визуализация модели данных")
+query = query_controls(model_hash, data_model)
 
 try:
-    if BUILD_HTML.exists():
+    if not query.is_empty():
+        html_code, n_nodes, n_links = query_html(model_hash, query, data_model)
+        st.caption(f"Фрагмент: узлов {n_nodes}, связей {n_links}")
+        st.components.v1.html(html_code, height=850, scrolling=True)
+    elif BUILD_HTML.exists():
         html_code = BUILD_HTML.read_text(encoding="utf-8")
         st.components.v1.html(html_code, height=850, scrolling=True)
     else:
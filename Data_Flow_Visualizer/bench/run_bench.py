@@ -0,0 +1,171 @@
+"""
+Бенчмарк пайплайна на синтетических моделях разного размера.
+
+Для каждого размера модели отдельно замеряются: generate_html (сборка
+HTML с раскладкой), make_excel, rebuild_from_excel, сохранение и разбор
+YAML и загрузка из бинарного снимка. Время меряется без tracemalloc
+(лучшее из --repeat прогонов), пиковая память — отдельным прогоном
+под tracemalloc. Результат пишется в bench/results/<время>.json;
+--compare показывает изменение относительно прошлого файла.
+
+    python bench/run_bench.py --sizes 100 1000 10000 --columns 10
+    python bench/run_bench.py --sizes 1000 --compare bench/results/2025-11-20_120000.json
+"""
+import argparse
+import datetime
+import io
+import json
+import pathlib
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BASE = pathlib.Path(__file__).resolve().parent.parent
+if str(BASE) not in sys.path:
+    sys.path.insert(0, str(BASE))
+
+import yaml  # noqa: E402
+
+from bench.synth_model import make_model  # noqa: E402
+from src import generate_html  # noqa: E402
+from src.excel_io import make_excel, rebuild_from_excel  # noqa: E402
+from src.snapshot import YAML_DUMPER, load_yaml, parse_yaml, snapshot_path  # noqa: E402
+
+RESULTS_DIR = BASE / "bench" / "results"
+
+
+def _git_version():
+    try:
+        out = subprocess.run(["git", "describe", "--always", "--dirty"], cwd=BASE,
+                             capture_output=True, text=True, timeout=10)
+        return out.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def stages(model: dict, settings: dict, workdir: pathlib.Path):
+    """
+    Этапы бенчмарка: [(имя, подготовка, замер)]. Подготовка не входит в замер
+    и возвращает аргумент для него; результат замера не используется.
+    """
+    yaml_path = workdir / "model.yaml"
+    html_path = workdir / "model.html"
+    excel = make_excel(model).getvalue()
+
+    def run_yaml_save(_):
+        with open(yaml_path, "w", encoding="utf-8") as f:
+            yaml.dump(model, f, Dumper=YAML_DUMPER, allow_unicode=True, sort_keys=False)
+        return yaml_path.stat().st_size
+
+    run_yaml_save(None)  # этапы загрузки не должны зависеть от того, выбран ли yaml_save
+
+    def run_generate(_):
+        generate_html.build(model, settings, output=html_path, force=True)
+        return html_path.stat().st_size
+
+    def clear_layout_cache():
+        # каждый прогон генератора — «холодный», с расчётом раскладки: чистим и дисковый
+        # кэш, и память процесса (раскладки и JSON-фрагменты прошлой сборки)
+        for f in generate_html.LAYOUT_CACHE.glob("*.json"):
+            f.unlink()
+        generate_html._layout_memo.clear()
+        generate_html._render_state.clear()
+
+    def drop_snapshot():
+        snapshot_path(yaml_path).unlink(missing_ok=True)
+
+    def warm_snapshot():
+        load_yaml(yaml_path)
+
+    return [
+        ("generate_html", clear_layout_cache, run_generate),
+        ("make_excel", lambda: None, lambda _: len(make_excel(model).getvalue())),
+        ("rebuild_from_excel", lambda: io.BytesIO(excel), lambda buf: len(rebuild_from_excel(buf)["nodes"])),
+        ("yaml_save", lambda: None, run_yaml_save),
+        ("yaml_load", lambda: yaml_path.read_bytes(), lambda raw: len(parse_yaml(raw)["nodes"])),
+        ("snapshot_compile", drop_snapshot, lambda _: load_yaml(yaml_path) and snapshot_path(yaml_path).stat().st_size),
+        ("snapshot_load", warm_snapshot, lambda _: len(load_yaml(yaml_path)["nodes"])),
+    ]
+
+
+def measure(setup, run, repeat: int) -> dict:
+    best = None
+    for _ in range(repeat):
+        arg = setup()
+        start = time.perf_counter()
+        run(arg)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    arg = setup()
+    tracemalloc.start()
+    run(arg)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"seconds": round(best, 4), "peak_mb": round(peak / 2**20, 2)}
+
+
+def compare(current: list, previous_path: pathlib.Path):
+    previous = json.loads(previous_path.read_text(encoding="utf-8"))
+    before = {(r["nodes"], r["stage"]): r for r in previous["results"]}
+    print(f"\n📈 Сравнение с {previous_path.name} ({previous.get('version')}):")
+    for r in current:
+        old = before.get((r["nodes"], r["stage"]))
+        if old and old["seconds"]:
+            ratio = r["seconds"] / old["seconds"]
+            flag = "⚠️" if ratio > 1.2 else "  "
+            print(f"{flag} {r['nodes']:>7} {r['stage']:<20} {old['seconds']:>9.3f}s → {r['seconds']:>9.3f}s  ×{ratio:.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарк пайплайна Data Flow Visualizer")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--fanout", type=int, default=2)
+    parser.add_argument("--columns", type=int, default=5)
+    parser.add_argument("--relation-density", type=float, default=0.1)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--stages", nargs="+", help="замерить только эти этапы")
+    parser.add_argument("--compare", type=pathlib.Path, help="прошлый JSON с результатами")
+    parser.add_argument("-o", "--output", type=pathlib.Path, help="куда записать JSON (по умолчанию bench/results/)")
+    args = parser.parse_args(argv)
+
+    settings = generate_html.load_settings()
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = pathlib.Path(tmp)
+        # кэш раскладок бенчмарка — во временном каталоге, а не в build/
+        generate_html.LAYOUT_CACHE = workdir / "layout_cache"
+        for size in args.sizes:
+            model = make_model(size, args.fanout, args.columns, args.relation_density)
+            n_edges = len(model["edges"]) + len(model["relations"])
+            print(f"\n🧪 Узлов: {size} | Связей: {n_edges}")
+            for name, setup, run in stages(model, settings, workdir):
+                if args.stages and name not in args.stages:
+                    continue
+                m = measure(setup, run, args.repeat)
+                results.append({"nodes": size, "edges": n_edges, "stage": name,
+                                "seconds": m["seconds"], "peak_mb": m["peak_mb"]})
+                print(f"   {name:<20} {m['seconds']:>9.3f}s  {m['peak_mb']:>9.2f} MB")
+
+    report = {
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "version": _git_version(),
+        "python": platform.python_version(),
+        "params": {"fanout": args.fanout, "columns": args.columns,
+                   "relation_density": args.relation_density, "repeat": args.repeat},
+        "results": results,
+    }
+    output = args.output or RESULTS_DIR / f"{datetime.datetime.now():%Y-%m-%d_%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"\n✅ Результаты: {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
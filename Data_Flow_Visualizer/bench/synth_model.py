@@ -0,0 +1,108 @@
+"""
+Генератор синтетических моделей для бенчмарков: слои Infrastructure → Data →
+Application → Business → Reporting, узлы по образцу config/data_model.yaml.
+
+    python bench/synth_model.py 10000 --fanout 2 --columns 10 -o build/synth_10k.yaml
+"""
+import argparse
+import pathlib
+import random
+import sys
+
+BASE = pathlib.Path(__file__).resolve().parent.parent
+if str(BASE) not in sys.path:
+    sys.path.insert(0, str(BASE))
+
+from src.layout import LAYER_ORDER  # noqa: E402
+
+NODE_KINDS = {
+    "Infrastructure": ("INF_Server", "Server"),
+    "Data": ("DB_Main", "Database"),
+    "Application": ("APP_Module", "Module"),
+    "Business": ("BUS_Department", "Department"),
+    "Reporting": ("REP_System", "Report"),
+}
+DATA_TYPES = ["workers", "progress", "hours", "cost", "materials", "documents"]
+TRANSFER_TYPES = ["pq", "manual", "planned"]
+COLUMN_TYPES = ["int", "float", "text", "date"]
+
+
+def make_model(n_nodes: int, fanout=2, columns=5, relation_density=0.1, seed=0) -> dict:
+    """
+    Модель из n_nodes узлов, поровну по слоям.
+    fanout — исходящих edges у узла в следующий слой, columns — колонок у узла,
+    relation_density — relations на узел (0.1 → одна на десять узлов).
+    """
+    rng = random.Random(seed)
+    per_layer = [n_nodes // len(LAYER_ORDER)] * len(LAYER_ORDER)
+    for i in range(n_nodes % len(LAYER_ORDER)):
+        per_layer[i] += 1
+
+    nodes, layers = [], []
+    for layer, count in zip(LAYER_ORDER, per_layer):
+        prefix, node_type = NODE_KINDS[layer]
+        names = []
+        for i in range(1, count + 1):
+            name = f"{prefix}_{i}"
+            names.append(name)
+            nodes.append({
+                "name": name,
+                "layer": layer,
+                "type": node_type,
+                "comment": f"{layer} node {name}",
+                "columns": [
+                    {"name": f"col_{j}", "type": rng.choice(COLUMN_TYPES), "description": f"Колонка {j} узла {name}"}
+                    for j in range(1, columns + 1)
+                ],
+            })
+        layers.append(names)
+
+    edges = []
+    for src_layer, dst_layer in zip(layers, layers[1:]):
+        if not dst_layer:
+            continue
+        for src in src_layer:
+            for dst in rng.sample(dst_layer, min(fanout, len(dst_layer))):
+                edges.append({
+                    "from": src,
+                    "to": dst,
+                    "transfer_type": rng.choice(TRANSFER_TYPES),
+                    "data_type": rng.choice(DATA_TYPES),
+                })
+
+    names = [n["name"] for n in nodes]
+    relations = []
+    for _ in range(int(n_nodes * relation_density)):
+        src, dst = rng.sample(names, 2)
+        relations.append({
+            "from": src,
+            "to": dst,
+            "connection": "coordination",
+            "process": rng.choice(["weekly", "monthly"]),
+            "comment": "Синтетическая связь",
+        })
+    return {"nodes": nodes, "edges": edges, "relations": relations}
+
+
+def main(argv=None):
+    import yaml
+    from src.snapshot import YAML_DUMPER
+
+    parser = argparse.ArgumentParser(description="Синтетическая модель данных для бенчмарков")
+    parser.add_argument("nodes", type=int)
+    parser.add_argument("--fanout", type=int, default=2)
+    parser.add_argument("--columns", type=int, default=5)
+    parser.add_argument("--relation-density", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", type=pathlib.Path, required=True)
+    args = parser.parse_args(argv)
+
+    model = make_model(args.nodes, args.fanout, args.columns, args.relation_density, args.seed)
+    with open(args.output, "w", encoding="utf-8") as f:
+        yaml.dump(model, f, Dumper=YAML_DUMPER, allow_unicode=True, sort_keys=False)
+    print(f"✅ {args.output}: узлов {len(model['nodes'])}, edges {len(model['edges'])}, "
+          f"relations {len(model['relations'])}")
+
+
+if __name__ == "__main__":
+    main()
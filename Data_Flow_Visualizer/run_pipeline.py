@@ -1,6 +1,111 @@
-import subprocess, pathlib, datetime
-print("🚀 Запуск пайплайна Data Flow Visualizer...")
-timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-subprocess.run(["python","src/generate_html.py"], check=True)
-pathlib.Path("docs/build_log.txt").write_text(f"Build at {timestamp}\n", encoding="utf-8")
-print("✅ Пайплайн завершён успешно.")
+"""
+Пайплайн сборки HTML.
+
+    python run_pipeline.py                          # config/data_model.yaml → build/data_model_v1.html
+    python run_pipeline.py --models-dir models/     # все *.yaml каталога → build/<имя>.html
+    python run_pipeline.py --manifest models.yaml   # список моделей из манифеста
+
+Манифест — YAML со списком models: путь к модели или словарь
+{model, output, lazy, overview, assets, compress}; относительные пути — от каталога манифеста.
+Пакетная сборка идёт в пуле процессов (--workers), неизменённые модели
+пропускаются по хэшу, итог по каждой модели печатается и пишется в журнал.
+"""
+import argparse
+import os
+import pathlib
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+BASE = pathlib.Path(__file__).resolve().parent
+sys.path.insert(0, str(BASE))
+
+from src.generate_html import OUTPUT, build_file, discover_models, load_settings, main as generate_html  # noqa: E402
+from src.metrics import from_settings, stage  # noqa: E402
+from src.snapshot import load_yaml  # noqa: E402
+
+
+def read_manifest(manifest: pathlib.Path, out_dir: pathlib.Path) -> list:
+    root = manifest.parent
+    jobs = []
+    for entry in (load_yaml(manifest) or {}).get("models", []):
+        if isinstance(entry, str):
+            entry = {"model": entry}
+        model = root / entry["model"]
+        output = root / entry["output"] if entry.get("output") else out_dir / f"{model.stem}.html"
+        jobs.append({
+            "model": model,
+            "output": output,
+            "lazy": bool(entry.get("lazy", False)),
+            "overview": entry.get("overview"),
+            "assets": entry.get("assets"),
+            "compress": tuple(entry.get("compress", ())),
+        })
+    return jobs
+
+
+def run_batch(jobs: list, settings: dict, workers: int, force=False) -> list:
+    """Сборка моделей в пуле процессов; результаты в порядке завершения."""
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(build_file, job["model"], job["output"], settings, force,
+                        job.get("lazy", False), job.get("overview"), job.get("assets"), job.get("compress", ())): job
+            for job in jobs
+        }
+        for future in as_completed(futures):
+            result = future.result()
+            icon = {"built": "✅", "skipped": "⏭️", "failed": "❌"}[result["status"]]
+            print(f"{icon} {result['model']} → {result['output']}" + (f"\n   {result['error']}" if "error" in result else ""))
+            results.append(result)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Пайплайн Data Flow Visualizer")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--models-dir", type=pathlib.Path, help="собрать все модели каталога")
+    source.add_argument("--manifest", type=pathlib.Path, help="YAML-манифест со списком моделей")
+    parser.add_argument("--out-dir", type=pathlib.Path, default=OUTPUT.parent, help="каталог для HTML")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="число процессов сборки")
+    parser.add_argument("--force", action="store_true", help="пересобрать даже неизменённые модели")
+    args = parser.parse_args(argv)
+
+    print("🚀 Запуск пайплайна Data Flow Visualizer...")
+    settings = load_settings()
+    run = from_settings("run_pipeline", settings)  # None, если settings.metrics.enabled выключен
+
+    if not args.models_dir and not args.manifest:
+        with stage(run, "generate_html"):
+            generate_html(["--force"] if args.force else [])
+        if run is not None:
+            run.append_to()  # JSON-строка в docs/build_log.txt; этапы генератора — отдельной записью
+        print("✅ Пайплайн завершён успешно.")
+        return 0
+
+    if args.models_dir:
+        jobs = discover_models(args.models_dir, args.out_dir)
+    else:
+        jobs = read_manifest(args.manifest, args.out_dir)
+    if not jobs:
+        print("⚠️ Модели не найдены.")
+        return 1
+
+    workers = max(1, min(args.workers, len(jobs)))
+    print(f"📦 Моделей: {len(jobs)} | Процессов: {workers}")
+    with stage(run, "batch") as rec:
+        results = run_batch(jobs, settings, workers, args.force)
+        for status in ("built", "skipped", "failed"):
+            rec[status] = sum(r["status"] == status for r in results)
+    if run is not None:
+        run.append_to()
+
+    print(f"📊 Собрано: {rec['built']} | Без изменений: {rec['skipped']} | Ошибок: {rec['failed']}")
+    if rec["failed"]:
+        print("❌ Пайплайн завершён с ошибками.")
+        return 1
+    print("✅ Пайплайн завершён успешно.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
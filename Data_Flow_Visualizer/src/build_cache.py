@@ -0,0 +1,38 @@
+"""Кэш сборки: пропуск генерации HTML, если содержимое не изменилось."""
+import hashlib
+import json
+import pathlib
+
+
+def content_hash(*parts) -> str:
+    """SHA-256 от набора частей (dict/list сериализуются в канонический JSON)."""
+    h = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, bytes):
+            data = part
+        elif isinstance(part, str):
+            data = part.encode("utf-8")
+        else:
+            data = json.dumps(part, ensure_ascii=False, sort_keys=True, default=str).encode("utf-8")
+        # длина как разделитель, чтобы ("ab", "c") и ("a", "bc") давали разные хэши
+        h.update(len(data).to_bytes(8, "little"))
+        h.update(data)
+    return h.hexdigest()
+
+
+def stamp_path(output) -> pathlib.Path:
+    output = pathlib.Path(output)
+    return output.with_name(output.name + ".hash")
+
+
+def is_fresh(output, digest: str) -> bool:
+    """True, если output существует и собран из того же содержимого."""
+    output = pathlib.Path(output)
+    stamp = stamp_path(output)
+    if not output.exists() or not stamp.exists():
+        return False
+    return stamp.read_text(encoding="utf-8").strip() == digest
+
+
+def mark_built(output, digest: str):
+    stamp_path(output).write_text(digest, encoding="utf-8")
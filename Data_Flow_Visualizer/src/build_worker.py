@@ -0,0 +1,103 @@
+"""Фоновый поток сборки с очередью: редактор не ждёт генерацию, повторные заявки склеиваются."""
+import threading
+import time
+import traceback
+
+FAILED_JOBS_LIMIT = 100  # сколько последних неудачных заявок помнить для job_error()
+
+
+class BuildWorker:
+    """
+    Один поток-исполнитель. submit() ставит заявку и сразу возвращает её номер;
+    все заявки, накопившиеся, пока поток занят, обрабатываются одной пачкой:
+    handler(payloads) получает их списком в порядке поступления и возвращает
+    строку-итог. Статус читается через status() — его опрашивает интерфейс.
+    Если пачка упала, заявки повторяются по одной: удачные применяются,
+    ошибка достаётся только своей заявке (job_error(номер)).
+    """
+
+    def __init__(self, handler, name="build-worker"):
+        self.handler = handler
+        self._cond = threading.Condition()
+        self._pending = []
+        self._seq = 0
+        self._status = {
+            "state": "idle",     # idle | queued | running | done | failed
+            "queued": 0,         # заявок в очереди
+            "running": 0,        # номер последней заявки выполняемой пачки
+            "done": 0,           # номер последней обработанной заявки
+            "coalesced": 0,      # сколько заявок в последней пачке
+            "message": "",
+            "error": None,
+            "seconds": None,
+            "finished_at": None,
+        }
+        self._failed = {}  # номер заявки → текст ошибки
+        self._thread = threading.Thread(target=self._loop, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, payload) -> int:
+        with self._cond:
+            self._seq += 1
+            self._pending.append(payload)
+            self._status["queued"] = len(self._pending)
+            if self._status["state"] != "running":
+                self._status["state"] = "queued"
+            self._cond.notify_all()
+            return self._seq
+
+    def status(self) -> dict:
+        with self._cond:
+            return dict(self._status)
+
+    def job_error(self, job: int):
+        """Текст ошибки, если заявка job обработана с ошибкой, иначе None."""
+        with self._cond:
+            return self._failed.get(job)
+
+    def wait(self, job: int, timeout=None) -> bool:
+        """Ждёт, пока заявка job будет обработана; False — истёк timeout."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._status["done"] >= job, timeout)
+
+    def _run(self, batch):
+        try:
+            return self.handler(batch) or "", None
+        except Exception:
+            return "", traceback.format_exc()
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending)
+                batch, self._pending = self._pending, []
+                last = self._seq
+                self._status.update(state="running", queued=0, running=last, coalesced=len(batch))
+            first = last - len(batch) + 1  # номера заявок пачки идут подряд
+            started = time.perf_counter()
+            message, error = self._run(batch)
+            failed = {first: error} if error else {}
+            if error and len(batch) > 1:
+                # одна плохая заявка не должна отменять остальные — повторяем по одной
+                failed, messages = {}, []
+                for job, payload in enumerate(batch, first):
+                    job_message, job_error = self._run([payload])
+                    if job_error:
+                        failed[job] = job_error
+                    else:
+                        messages.append(job_message)
+                message = "; ".join(messages)
+                error = failed[max(failed)] if failed else None
+            with self._cond:
+                self._failed.update(failed)
+                for job in sorted(self._failed)[:-FAILED_JOBS_LIMIT]:
+                    del self._failed[job]
+                self._status.update(
+                    state="queued" if self._pending else ("failed" if error else "done"),
+                    done=last,
+                    message=message,
+                    error=error,
+                    seconds=round(time.perf_counter() - started, 3),
+                    finished_at=time.strftime("%H:%M:%S"),
+                )
+                self._cond.notify_all()
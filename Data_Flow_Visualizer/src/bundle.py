@@ -0,0 +1,108 @@
+"""Подключение vis-network и tom-select к странице и предсжатые копии HTML для раздачи без внешних запросов."""
+import contextlib
+import pathlib
+import shutil
+import zlib
+
+from src.file_safety import atomic_open
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent.parent  # корень репозитория
+VIS_VERSION = "vis-9.1.2"
+VIS_JS = ROOT / "lib" / VIS_VERSION / "vis-network.min.js"  # вендорная копия из репозитория
+VIS_CDN = "https://unpkg.com/vis-network/standalone/umd/vis-network.min.js"
+TOM_SELECT_VERSION = "2.0.0-rc.4"  # поиск узлов на странице
+TOM_SELECT_DIR = ROOT / "lib" / "tom-select"
+TOM_SELECT_JS = TOM_SELECT_DIR / "tom-select.complete.min.js"
+TOM_SELECT_CSS = TOM_SELECT_DIR / "tom-select.css"
+TOM_SELECT_CDN = f"https://cdn.jsdelivr.net/npm/tom-select@{TOM_SELECT_VERSION}/dist"
+
+# cdn — как раньше, с unpkg; inline — библиотека внутри HTML (одна страница без
+# внешних запросов, подходит для st.components.v1.html); local — копия рядом с HTML
+ASSET_MODES = ("cdn", "inline", "local")
+COMPRESS_FORMATS = ("gz", "br")
+
+
+def _local_copy(source: pathlib.Path, output: pathlib.Path, folder: str) -> str:
+    """Копия вендорного файла в <каталог HTML>/lib/<folder>/ (если её нет или она другая); путь от HTML."""
+    target = output.parent / "lib" / folder / source.name
+    if not target.exists() or target.stat().st_size != source.stat().st_size:
+        target.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(source, target)
+    return f"lib/{folder}/{source.name}"
+
+
+def _inline_js(source: pathlib.Path) -> str:
+    js = source.read_text(encoding="utf-8").replace("</script", "<\\/script")
+    return f"<script>{js}</script>"
+
+
+def vis_script_tag(mode: str, output: pathlib.Path) -> str:
+    if mode == "cdn":
+        return f'<script src="{VIS_CDN}"></script>'
+    if mode == "inline":
+        return _inline_js(VIS_JS)
+    if mode == "local":
+        return f'<script src="{_local_copy(VIS_JS, output, VIS_VERSION)}"></script>'
+    raise ValueError(f"Неизвестный режим подключения библиотек: {mode}")
+
+
+def search_lib_tags(mode: str, output: pathlib.Path) -> str:
+    """tom-select (JS + CSS) для поиска узлов — в том же режиме, что и vis-network."""
+    if mode == "cdn":
+        return (f'<link rel="stylesheet" href="{TOM_SELECT_CDN}/css/tom-select.css">\n'
+                f'<script src="{TOM_SELECT_CDN}/js/tom-select.complete.min.js"></script>')
+    if mode == "inline":
+        css = TOM_SELECT_CSS.read_text(encoding="utf-8").replace("</style", "<\\/style")
+        return f"<style>{css}</style>\n{_inline_js(TOM_SELECT_JS)}"
+    if mode == "local":
+        return (f'<link rel="stylesheet" href="{_local_copy(TOM_SELECT_CSS, output, "tom-select")}">\n'
+                f'<script src="{_local_copy(TOM_SELECT_JS, output, "tom-select")}"></script>')
+    raise ValueError(f"Неизвестный режим подключения библиотек: {mode}")
+
+
+def _compressors(formats) -> dict:
+    """Потоковые упаковщики по форматам; brotli — необязательная зависимость, без неё .br пропускается."""
+    packers = {}
+    for fmt in COMPRESS_FORMATS:
+        if fmt not in formats:
+            continue
+        if fmt == "gz":
+            packers[fmt] = zlib.compressobj(9, zlib.DEFLATED, 16 + zlib.MAX_WBITS)  # gzip-обёртка, mtime=0
+        else:
+            try:
+                import brotli
+            except ImportError:
+                print("⚠️ Модуль brotli не установлен — .br не создан (pip install brotli).")
+                continue
+            packers[fmt] = brotli.Compressor(quality=11)
+    return packers
+
+
+def write_html(output: pathlib.Path, chunks, formats=()) -> dict:
+    """
+    Пишет HTML из потока кусков str одним проходом: сам output и предсжатые
+    копии output.gz / output.br (для раздачи с Content-Encoding). Документ
+    целиком в памяти не собирается; каждый файл заменяется атомарно.
+    Устаревшие копии других форматов удаляются. Возвращает {"html" | формат: байт}.
+    """
+    packers = _compressors(formats)
+    for fmt in COMPRESS_FORMATS:
+        if fmt not in packers:
+            output.with_name(f"{output.name}.{fmt}").unlink(missing_ok=True)
+    sizes = dict.fromkeys(["html", *packers], 0)
+    with contextlib.ExitStack() as files:
+        html = files.enter_context(atomic_open(output))
+        packed = {fmt: files.enter_context(atomic_open(output.with_name(f"{output.name}.{fmt}"))) for fmt in packers}
+        for chunk in chunks:
+            data = chunk.encode("utf-8")
+            html.write(data)
+            sizes["html"] += len(data)
+            for fmt, packer in packers.items():
+                block = packer.compress(data) if fmt == "gz" else packer.process(data)
+                packed[fmt].write(block)
+                sizes[fmt] += len(block)
+        for fmt, packer in packers.items():
+            block = packer.flush() if fmt == "gz" else packer.finish()
+            packed[fmt].write(block)
+            sizes[fmt] += len(block)
+    return sizes
@@ -0,0 +1,115 @@
+"""Обзорный граф (level of detail): кластеры по слою или слою+типу и пучки связей между ними."""
+import math
+from collections import Counter
+
+from src.layout import layered_layout
+
+CLUSTER_MODES = ("layer", "layer_type")
+MEMBER_GAP_X = 220  # сетка узлов раскрытого кластера, px
+MEMBER_GAP_Y = 70
+
+
+def cluster_key(node, by: str) -> str:
+    """Ключ кластера для узла src.model.Node."""
+    if by == "layer":
+        return node.layer
+    if by == "layer_type":
+        return f"{node.layer} / {node.type}"
+    raise ValueError(f"Неизвестная группировка кластеров: {by}")
+
+
+def _member_grid(members, cx, cy):
+    """Копии vis-узлов кластера, разложенные сеткой вокруг центра кластера."""
+    cols = max(1, math.ceil(math.sqrt(len(members))))
+    rows = math.ceil(len(members) / cols)
+    placed = []
+    for i, vn in enumerate(members):
+        col, row = i % cols, i // cols
+        placed.append(dict(
+            vn,
+            x=cx + (col - (cols - 1) / 2) * MEMBER_GAP_X,
+            y=cy + (row - (rows - 1) / 2) * MEMBER_GAP_Y,
+        ))
+    return placed
+
+
+def build_overview(nodes, vis_nodes, vis_edges, by="layer"):
+    """
+    Сворачивает граф до кластеров.
+    nodes — узлы модели в том же порядке, что vis_nodes; vis_edges — готовые
+    vis-связи (edges + relations). Возвращает (cluster_nodes, bundle_edges, members):
+    members[k] — пачка для подгрузки k-го кластера: его узлы и все связи,
+    у которых хотя бы один конец внутри кластера. Связи с концом вне модели
+    в обзор не попадают.
+    """
+    # --- Узлы → кластеры ---
+    cluster_of, groups = {}, {}
+    for n, vn in zip(nodes, vis_nodes):
+        key = cluster_key(n, by)
+        cid = f"cluster:{key}"
+        cluster_of[vn["id"]] = cid
+        group = groups.setdefault(cid, {"key": key, "layer": n.layer, "nodes": []})
+        group["nodes"].append(dict(vn, cluster=cid))
+
+    # --- Пучки связей между кластерами ---
+    bundles, incident = {}, {cid: [] for cid in groups}
+    for ve in vis_edges:
+        src, dst = cluster_of.get(ve["from"]), cluster_of.get(ve["to"])
+        if src is None or dst is None:
+            continue
+        edge = dict(ve, from_cluster=src, to_cluster=dst)
+        incident[src].append(edge)
+        if dst == src:
+            continue  # связи внутри кластера видны только после раскрытия
+        incident[dst].append(edge)
+        bundle = bundles.setdefault((src, dst), {"data_type": Counter(), "transfer_type": Counter(), "color": {}})
+        bundle["data_type"][ve["data_type"]] += 1
+        bundle["transfer_type"][ve["transfer_type"]] += 1
+        bundle["color"].setdefault(ve["data_type"], ve["color"])
+
+    bundle_edges = []
+    for (src, dst), bundle in bundles.items():
+        count = sum(bundle["data_type"].values())
+        d_type = bundle["data_type"].most_common(1)[0][0]
+        bundle_edges.append({
+            "id": f"bundle:{src}|{dst}",
+            "from": src,
+            "to": dst,
+            "bundle": True,
+            "count": count,
+            "data_type": d_type,
+            "transfer_type": bundle["transfer_type"].most_common(1)[0][0],
+            "breakdown": bundle["data_type"].most_common(),
+            "color": bundle["color"][d_type],
+            "width": 1 + 1.5 * math.log2(count),
+            "label": str(count),
+            "arrows": {"to": {"enabled": True, "type": "arrow", "scaleFactor": 0.8}},
+            "length": 350,
+        })
+
+    # --- Раскладка кластеров по слоям, участники — сеткой вокруг кластера ---
+    positions = layered_layout(
+        [(cid, group["layer"]) for cid, group in groups.items()],
+        list(bundles),
+    )
+    cluster_nodes, members = [], []
+    for k, (cid, group) in enumerate(groups.items()):
+        cx, cy = positions[cid]
+        count = len(group["nodes"])
+        cluster_nodes.append({
+            "id": cid,
+            "label": f"{group['key']}\n({count})",
+            "group": group["layer"],
+            "value": 18 + 3 * min(count, 15),
+            "font": {"size": 18},
+            "x": cx,
+            "y": cy,
+            "cluster_shard": k,
+            "cluster_size": count,
+        })
+        members.append({
+            "cluster": cid,
+            "nodes": _member_grid(group["nodes"], cx, cy),
+            "edges": incident[cid],
+        })
+    return cluster_nodes, bundle_edges, members
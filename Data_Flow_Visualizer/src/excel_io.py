@@ -0,0 +1,134 @@
+"""Импорт и экспорт модели данных в Excel-книгу (листы Nodes / Columns / Edges / Relations)."""
+from io import BytesIO
+
+import openpyxl
+import pandas as pd
+
+NODE_FIELDS = ["name", "layer", "type", "comment"]
+COLUMN_FIELDS = ["node_name", "name", "type", "description", "comment"]
+EDGE_FIELDS = ["from", "to", "transfer_type", "data_type", "transfer"]
+RELATION_FIELDS = ["from", "to", "connection", "process", "comment"]
+
+
+def read_sheet(wb, sheet_name: str, default_columns) -> pd.DataFrame:
+    """Лист целиком в DataFrame строк: первая строка — заголовки, пустые ячейки → ""."""
+    if sheet_name not in wb.sheetnames:
+        return pd.DataFrame(columns=default_columns)
+
+    rows = wb[sheet_name].iter_rows(values_only=True)
+    header = next(rows, None)
+    if header is None:
+        return pd.DataFrame(columns=default_columns)
+
+    # колонки без заголовка (хвосты форматирования) отбрасываем
+    keep = [i for i, h in enumerate(header) if h is not None]
+    df = pd.DataFrame(list(rows))
+    df = df.reindex(columns=keep)
+    df.columns = [str(header[i]) for i in keep]
+    return df.fillna("").astype(str)
+
+
+def rebuild_from_excel(uploaded_file) -> dict:
+    """
+    Собирает модель из книги за один проход по каждому листу:
+    колонки группируются по node_name, связи выгружаются через to_dict.
+    """
+    wb = openpyxl.load_workbook(uploaded_file, read_only=True, data_only=True)
+    try:
+        df_nodes = read_sheet(wb, "Nodes", NODE_FIELDS)
+        df_cols = read_sheet(wb, "Columns", COLUMN_FIELDS)
+        df_edges = read_sheet(wb, "Edges", EDGE_FIELDS)
+        df_rel = read_sheet(wb, "Relations", RELATION_FIELDS)
+    finally:
+        wb.close()
+
+    # --- Колонки: одна группировка вместо фильтра на каждый узел ---
+    columns_by_node = {}
+    if "node_name" in df_cols.columns and len(df_cols):
+        col_fields = [c for c in df_cols.columns if c != "node_name"]
+        records = df_cols[col_fields].to_dict(orient="records")
+        for node_name, positions in df_cols.groupby("node_name", sort=False).indices.items():
+            columns_by_node[node_name] = [records[i] for i in positions]
+
+    # --- Узлы ---
+    nodes = []
+    for n in df_nodes.to_dict(orient="records"):
+        node_name = n.get("name", "")
+        nodes.append({
+            "name": node_name,
+            "layer": n.get("layer", ""),
+            "type": n.get("type", ""),
+            "comment": n.get("comment", ""),
+            "columns": columns_by_node.get(node_name, []),
+        })
+
+    return {
+        "nodes": nodes,
+        "edges": df_edges.to_dict(orient="records"),
+        "relations": df_rel.to_dict(orient="records"),
+    }
+
+
+# --------- Экспорт ---------
+def _cell(value):
+    """Значение ячейки: скаляры как есть, списки/словари (например transfer) — строкой."""
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+def _union_keys(records, first=()) -> list:
+    """Объединение ключей записей в порядке первого появления (как у pd.DataFrame)."""
+    keys = dict.fromkeys(first)
+    for rec in records:
+        keys.update(dict.fromkeys(rec))
+    return list(keys)
+
+
+def _write_records(wb, sheet_name: str, records, default_columns):
+    ws = wb.create_sheet(sheet_name)
+    header = _union_keys(records) or list(default_columns)
+    ws.append(header)
+    for rec in records:
+        ws.append([_cell(rec.get(k)) for k in header])
+
+
+def make_excel(data_model: dict, target=None):
+    """
+    Потоковая выгрузка модели: книга openpyxl в режиме write-only,
+    строки пишутся по одной, без промежуточных DataFrame.
+    target — путь или файловый объект; без него возвращается BytesIO.
+    """
+    wb = openpyxl.Workbook(write_only=True)
+    nodes = data_model.get("nodes", [])
+
+    # ----- Лист 1: Узлы -----
+    ws = wb.create_sheet("Nodes")
+    ws.append(NODE_FIELDS)
+    for n in nodes:
+        ws.append([_cell(n.get(k, "")) for k in NODE_FIELDS])
+
+    # ----- Лист 2: Колонки -----
+    header = _union_keys((col for n in nodes for col in n.get("columns", [])), first=["node_name"])
+    if header == ["node_name"]:
+        header = list(COLUMN_FIELDS)
+    ws = wb.create_sheet("Columns")
+    ws.append(header)
+    for n in nodes:
+        node_name = n.get("name", "")
+        for col in n.get("columns", []):
+            ws.append([node_name] + [_cell(col.get(k)) for k in header[1:]])
+
+    # ----- Лист 3: Связи -----
+    _write_records(wb, "Edges", data_model.get("edges", []), EDGE_FIELDS)
+
+    # ----- Лист 4: Relations -----
+    _write_records(wb, "Relations", data_model.get("relations", []), RELATION_FIELDS)
+
+    if target is not None:
+        wb.save(target)
+        return target
+    buffer = BytesIO()
+    wb.save(buffer)
+    buffer.seek(0)
+    return buffer
@@ -0,0 +1,90 @@
+"""Атомарная запись файлов и межпроцессная блокировка (редактор, watch, пакетная сборка)."""
+import contextlib
+import os
+import pathlib
+import tempfile
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# umask процесса: читается один раз при импорте (os.umask меняет её, чтение — только через установку)
+_UMASK = os.umask(0o022)
+os.umask(_UMASK)
+
+
+def _file_mode(path: pathlib.Path) -> int:
+    """Права для нового содержимого: как у заменяемого файла, иначе как у open() — 0o666 без umask."""
+    try:
+        return path.stat().st_mode & 0o7777
+    except FileNotFoundError:
+        return 0o666 & ~_UMASK
+
+
+@contextlib.contextmanager
+def atomic_open(path):
+    """
+    Бинарный файл для потоковой записи через временный файл в том же каталоге:
+    по выходу из блока — fsync и os.replace, при ошибке временный файл удаляется.
+    Права файла сохраняются (mkstemp создаёт 0600 — временному файлу они
+    выставляются до замены).
+    """
+    path = pathlib.Path(path)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp, _file_mode(path))
+        os.replace(tmp, path)
+    except BaseException:
+        pathlib.Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+def atomic_write(path, data):
+    """
+    Пишет data (bytes или str в UTF-8) через временный файл в том же каталоге
+    и os.replace: читатель видит либо старый файл, либо новый целиком.
+    """
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    with atomic_open(path) as f:
+        f.write(data)
+
+
+def lock_path(path) -> pathlib.Path:
+    path = pathlib.Path(path)
+    return path.with_name(f".{path.name}.lock")
+
+
+@contextlib.contextmanager
+def file_lock(path):
+    """
+    Эксклюзивная блокировка <каталог>/.<имя>.lock на время блока (ждёт, если занята).
+    fcntl.flock на POSIX, msvcrt.locking на Windows; lock-файл не удаляется.
+    """
+    lock = lock_path(path)
+    lock.parent.mkdir(parents=True, exist_ok=True)
+    with open(lock, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:  # LK_LOCK сдаётся через ~10 с — ждём дальше
+                    continue
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
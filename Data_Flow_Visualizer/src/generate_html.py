@@ -1,141 +1,704 @@
+import argparse
+import contextlib
+import functools
+import itertools
 import pathlib
 import json
-import yaml
+import os
+import re
+import shutil
+import sys
+import time
 
 BASE = pathlib.Path(__file__).resolve().parent.parent  # корень проекта
+if str(BASE) not in sys.path:
+    sys.path.insert(0, str(BASE))  # запуск как скрипта: python src/generate_html.py
+
+from src.build_cache import content_hash, is_fresh, mark_built, stamp_path  # noqa: E402
+from src.bundle import ASSET_MODES, COMPRESS_FORMATS, search_lib_tags, vis_script_tag, write_html  # noqa: E402
+from src.clusters import CLUSTER_MODES, build_overview  # noqa: E402
+from src.file_safety import atomic_write, file_lock, lock_path  # noqa: E402
+from src.graph_index import GraphIndex  # noqa: E402
+from src.layout import compute_layout, extend_layout  # noqa: E402
+from src.metrics import from_settings, stage  # noqa: E402
+from src.model import Model, StyleTable  # noqa: E402
+from src.model_store import ModelStore, sqlite_path  # noqa: E402
+from src.snapshot import file_hash, load_with_hash, load_yaml  # noqa: E402
+from src.subgraph import Query, cached_extract, make_query  # noqa: E402
+from src.viewer_index import edge_index, filter_vocabulary, search_index  # noqa: E402
+
 TEMPLATE = BASE / "src" / "html_template.html"
 YAML_FILE = BASE / "config" / "data_model.yaml"
 SETTINGS_FILE = BASE / "config" / "settings.yaml"
 OUTPUT = BASE / "build" / "data_model_v1.html"
+# код генератора тоже входит в ключ кэша сборки: правка src/*.py пересобирает HTML
+CODE_HASH = content_hash(*(f.read_bytes() for f in sorted((BASE / "src").glob("*.py"))))
+LAYOUT_CACHE = BASE / "build" / ".layout_cache"
+LAYOUT_CACHE_LIMIT = 20  # сколько последних раскладок держать в памяти процесса
+# раскладок на диске (settings.layout.cache_files): кэш общий для процессов пакетной сборки,
+# так что лимит должен вмещать раскладки всех моделей пакета
+LAYOUT_CACHE_FILES = 500
+QUERY_OUTPUT_LIMIT = 20   # сколько последних фрагментов (--root ...) хранить в build/
+DETAILS_PER_SHARD = 50    # узлов в одном файле деталей (режим lazy)
+STREAM_BATCH = 1000       # элементов JSON в одном куске потоковой записи HTML
+PLACEHOLDER_RE = re.compile(r"__(?:NODE_DATA|VIS_NODES|VIS_EDGES|PHYSICS|DETAILS|CLUSTERS|INDEX|VIS_LIB|SEARCH_LIB)__")
 
+# --- Настройки по умолчанию (если settings.yaml отсутствует) ---
+DEFAULT_SETTINGS = {
+    "colors": {
+        "data_type": {"default": "#cfcfcf"},
+        "transfer_type": {
+            "pq": {"dashes": False, "opacity": 1.0},
+            "manual": {"dashes": True, "opacity": 0.7},
+            "planned": {"dashes": False, "opacity": 0.8},
+            "relation": {"dashes": True, "opacity": 0.8},
+        },
+    }
+}
 
-def textify(v):
-    """Принудительно преобразует всё в текст (включая ключи и значения)."""
-    if isinstance(v, dict):
-        return {str(k): textify(vv) for k, vv in v.items()}
-    if isinstance(v, list):
-        return [textify(x) for x in v]
-    return "" if v is None else str(v)
 
+def load_model(path=YAML_FILE) -> dict:
+    return load_yaml(path) or {}
 
-def main():
-    tpl = pathlib.Path(TEMPLATE).read_text(encoding="utf-8")
-    data_model = yaml.safe_load(pathlib.Path(YAML_FILE).read_text(encoding="utf-8"))
 
-    # --- Базовые элементы модели ---
-    nodes = data_model.get("nodes", [])
-    edges = data_model.get("edges", [])
-    relations = data_model.get("relations", [])
+def load_settings(path=SETTINGS_FILE) -> dict:
+    if pathlib.Path(path).exists():
+        return load_yaml(path) or DEFAULT_SETTINGS
+    return DEFAULT_SETTINGS
+
+
+# раскладки, уже посчитанные или прочитанные в этом процессе (watch, Streamlit)
+_layout_memo = {}
+# состояние прошлой сборки по выходному файлу: раскладка и готовые JSON-фрагменты узлов
+# (для дельта-сборок из редактора, см. build(keep_state=True)); хранится для одного файла
+_render_state = {}
+
+
+def encode_json(value) -> str:
+    """Компактный JSON для встраивания в <script>: без пробелов, "</" экранировано."""
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).replace("</", "<\\/")
+
+
+def iter_json(items, fragments=False, timers=()):
+    """
+    Тот же JSON, что encode_json(items), кусками по STREAM_BATCH элементов
+    списка (или пар словаря): документ целиком в памяти не собирается, а пачка
+    кодируется одним вызовом json — почти так же быстро, как весь список сразу.
+    fragments=True — значения уже закодированы (готовые JSON-фрагменты).
+    timers — словари замеров: время кодирования и длина JSON прибавляются
+    к их "seconds" и "chars".
+    """
+    is_dict = isinstance(items, dict)
+    opening, closing = "{}" if is_dict else "[]"
+    rest = iter(items.items() if is_dict else items)
+    prefix = opening
+    while batch := list(itertools.islice(rest, STREAM_BATCH)):
+        started = time.perf_counter()
+        if not fragments:
+            body = encode_json(dict(batch) if is_dict else batch)[1:-1]
+        elif is_dict:
+            body = ",".join(f"{encode_json(k)}:{v}" for k, v in batch)
+        else:
+            body = ",".join(batch)
+        elapsed = time.perf_counter() - started
+        for timer in timers:
+            timer["seconds"] = round(timer.get("seconds", 0) + elapsed, 4)
+            timer["chars"] = timer.get("chars", 0) + len(body)
+        yield prefix + body
+        prefix = ","
+    yield closing if prefix == "," else opening + closing
+
+
+@functools.lru_cache(maxsize=4)
+def split_template(tpl: str) -> tuple:
+    """Шаблон, разрезанный по плейсхолдерам один раз: (текст, имя, текст, имя, ..., текст)."""
+    parts = []
+    last = 0
+    for m in PLACEHOLDER_RE.finditer(tpl):
+        parts += [tpl[last:m.start()], m.group()]
+        last = m.end()
+    parts.append(tpl[last:])
+    return tuple(parts)
+
+
+def stream_template(tpl: str, payloads: dict):
+    """Куски страницы: текст шаблона и значения плейсхолдеров (str или итератор кусков)."""
+    for k, part in enumerate(split_template(tpl)):
+        if k % 2 == 0:
+            if part:
+                yield part
+        elif isinstance(payloads[part], str):
+            yield payloads[part]
+        else:
+            yield from payloads[part]
+
+
+def _remember_layout(key, positions):
+    _layout_memo[key] = positions
+    while len(_layout_memo) > LAYOUT_CACHE_LIMIT:
+        del _layout_memo[next(iter(_layout_memo))]
+
+
+def layout_positions(model: Model, settings: dict, previous=None):
+    """
+    Координаты узлов по settings.layout.mode ('layered' | 'force' | 'physics').
+    Для 'physics' возвращает None — раскладку делает браузер.
+    Результат кэшируется по хэшу топологии: правка колонок или комментариев
+    не требует пересчёта.
+    previous: раскладка прошлой сборки — если топология изменилась,
+    старые узлы сохраняют координаты и досчитываются только новые.
+    """
+    layout_cfg = settings.get("layout") or {}
+    mode = layout_cfg.get("mode", "layered")
+    if mode == "physics":
+        return None
+    iterations = int(layout_cfg.get("iterations", 200))
+
+    nodes = [(n.name, n.layer) for n in model.nodes]
+    links = model.links()
+    key = content_hash(nodes, links, mode, iterations)
+    if key in _layout_memo:
+        return _layout_memo[key]
+    cache_file = LAYOUT_CACHE / f"{key}.json"
+    try:
+        positions = json.loads(cache_file.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        positions = None  # нет в кэше или удалена чисткой другого процесса — считаем заново
+    if positions is not None:
+        with contextlib.suppress(FileNotFoundError):
+            os.utime(cache_file)  # свежая mtime — при чистке раскладка считается недавней
+        _remember_layout(key, positions)
+        return positions
+
+    positions = extend_layout(previous, nodes, links, mode) if previous else None
+    if positions is None:
+        positions = compute_layout(nodes, links, mode=mode, iterations=iterations)
+    _remember_layout(key, positions)
+    LAYOUT_CACHE.mkdir(parents=True, exist_ok=True)
+    atomic_write(cache_file, json.dumps(positions, ensure_ascii=False))
+
+    # --- Чистим старые раскладки (под блокировкой: пакетная сборка пишет кэш из многих процессов) ---
+    limit = int(layout_cfg.get("cache_files", LAYOUT_CACHE_FILES))
+    with file_lock(LAYOUT_CACHE):
+        cached = []
+        for f in LAYOUT_CACHE.glob("*.json"):
+            try:
+                cached.append((f.stat().st_mtime, f))
+            except FileNotFoundError:
+                continue
+        cached.sort(reverse=True)
+        for _, old in cached[limit:]:
+            old.unlink(missing_ok=True)
+    return positions
+
+
+def physics_options(settings: dict, positions) -> dict:
+    """Опции physics для vis-network: выключены, если координаты уже посчитаны."""
+    if positions is not None:
+        return {"enabled": False}
+    physics = settings.get("physics") or {}
+    return {
+        "enabled": True,
+        "barnesHut": {"gravitationalConstant": physics.get("gravitationalConstant", -3000)},
+    }
+
+
+def details_dir(output) -> pathlib.Path:
+    """Каталог с файлами деталей узлов рядом с HTML (режим lazy)."""
+    output = pathlib.Path(output)
+    return output.with_name(output.stem + "_details")
+
+
+def clusters_dir(output) -> pathlib.Path:
+    """Каталог с пачками узлов кластеров рядом с HTML (режим overview)."""
+    output = pathlib.Path(output)
+    return output.with_name(output.stem + "_clusters")
+
+
+def node_details(n) -> dict:
+    """Детали узла (src.model.Node) для боковой панели: тип, слой, комментарий и таблица колонок."""
+    return {
+        "layer": n.layer,
+        "type": n.type,
+        "comment": n.comment,
+        "columns": [col.as_dict() for col in n.columns],
+    }
+
+
+def edge_styles(settings: dict) -> StyleTable:
+    colors = settings["colors"]
+    return StyleTable(colors["data_type"], colors["transfer_type"])
 
-    # --- Настройки (если файла нет, создаём базовые цвета) ---
-    if pathlib.Path(SETTINGS_FILE).exists():
-        settings = yaml.safe_load(pathlib.Path(SETTINGS_FILE).read_text(encoding="utf-8"))
-    else:
-        settings = {
-            "colors": {
-                "data_type": {"default": "#cfcfcf"},
-                "transfer_type": {
-                    "pq": {"dashes": False, "opacity": 1.0},
-                    "manual": {"dashes": True, "opacity": 0.7},
-                    "planned": {"dashes": False, "opacity": 0.8},
-                    "relation": {"dashes": True, "opacity": 0.8},
-                },
-            }
-        }
 
-    # --- Подсчёт степени (для массы узлов) ---
-    degree_count = {}
+def render_html(data_model: dict, settings: dict, tpl: str, metrics=None, **options):
+    """
+    Собирает HTML-страницу целиком в строку (встраивание в Streamlit).
+    Возвращает (html, shards, cluster_shards); параметры — как у render_stream.
+    """
+    encoded = {}
+    chunks, shards, cluster_shards = render_stream(
+        data_model, settings, tpl, metrics=metrics, encode_timer=encoded, **options
+    )
+    with stage(metrics, "template") as rec:
+        html = "".join(chunks)
+    if "seconds" in rec:  # кодирование JSON при склейке уже учтено в json_encode
+        rec["seconds"] = round(rec["seconds"] - encoded.get("seconds", 0), 4)
+    return html, shards, cluster_shards
 
-    def add_degree(name):
-        if not name:
-            return
-        degree_count[name] = degree_count.get(name, 0) + 1
 
-    for e in edges:
-        add_degree(str(e.get("from", "")))
-        add_degree(str(e.get("to", "")))
+def render_stream(data_model: dict, settings: dict, tpl: str, details_base=None, overview=None,
+                  clusters_base=None, metrics=None, vis_lib=None, changes=None, state=None, search_lib=None,
+                  encode_timer=None):
+    """
+    Собирает HTML-страницу из модели (dict из YAML или src.model.Model)
+    и настроек, без чтения/записи файлов.
+    Возвращает (chunks, shards, cluster_shards): chunks — итератор кусков
+    страницы (str); NODE_DATA, VIS_NODES и VIS_EDGES кодируются по мере
+    чтения, так что страница может писаться в файл без сборки в одну строку.
+    Если задан details_base, детали узлов не встраиваются в страницу,
+    а возвращаются списком shards — их надо записать в details_base/<номер>.js.
+    Если задан overview ('layer' | 'layer_type'), в страницу попадают только
+    кластеры и пучки связей; узлы кластеров с их деталями возвращаются
+    в cluster_shards для записи в clusters_base/<номер>.js.
+    metrics — необязательный src.metrics.Metrics для замеров по этапам;
+    потоковое кодирование идёт при чтении chunks, но его время дописывается
+    в этап json_encode и в словарь encode_timer (если задан) — вызывающий
+    вычитает его из этапа, где читал куски.
+    vis_lib / search_lib — теги подключения vis-network и tom-select
+    (по умолчанию — CDN, см. src/bundle.py).
+    state — словарь состояния прошлой сборки того же файла (раскладка и
+    JSON-фрагменты узлов); обновляется на месте. changes — дельта из
+    src.model_diff.diff_models: с ней детали пересчитываются только для
+    добавленных и изменённых узлов, раскладка — только для новых.
+    Фрагменты используются лишь в обычном режиме (без lazy и overview).
+    """
+    # --- Типизированная модель: записи, проверка ссылок и степень узлов за один проход ---
+    with stage(metrics, "model"):
+        model = data_model if isinstance(data_model, Model) else Model(data_model)
+    nodes = model.nodes
 
-    for r in relations:
-        add_degree(str(r.get("from", "")))
-        add_degree(str(r.get("to", "")))
+    # --- Раскладка ---
+    with stage(metrics, "layout"):
+        previous = state.get("layout") if state is not None and changes is not None else None
+        positions = layout_positions(model, settings, previous)
+    # готовые JSON-фрагменты узлов — только для дельта-сборок (build(keep_state=True)),
+    # иначе узлы и детали кодируются потоком при записи
+    fragments = state is not None and details_base is None and overview is None
+    if state is not None and not fragments:
+        state.clear()  # сборка в другом режиме — прошлые фрагменты больше не соответствуют файлу
+    old_nodes = state.get("nodes", {}) if fragments else {}
+    node_frags, new_nodes = [], {}
 
     # --- Узлы ---
-    vis_nodes = []
-    for n in nodes:
-        node_name = str(n.get("name", ""))
-        deg = degree_count.get(node_name, 1)
-        mass = max(1, deg)
-        size = 18 + 3 * min(deg, 15)
-        vis_nodes.append({
-            "id": node_name,
-            "label": f"{node_name}\n({n.get('layer', '')})",
-            "group": str(n.get("layer", "")),
-            "mass": mass,
-            "value": size,
-        })
+    with stage(metrics, "nodes"):
+        vis_nodes = []
+        for i, n in enumerate(nodes):
+            node_name = n.name
+            deg = model.degree.get(node_name) or 1
+            mass = max(1, deg)
+            size = 18 + 3 * min(deg, 15)
+            vis_node = {
+                "id": node_name,
+                "label": f"{node_name}\n({n.layer})",
+                "group": n.layer,
+                "mass": mass,
+                "value": size,
+            }
+            if positions is not None and node_name in positions:
+                vis_node["x"], vis_node["y"] = positions[node_name]
+            if details_base is not None:
+                vis_node["shard"] = i // DETAILS_PER_SHARD
+            vis_nodes.append(vis_node)
+            if fragments:
+                # узел не изменился (та же степень, координаты) — берём готовый JSON
+                cached = old_nodes.get(node_name)
+                frag = cached[1] if cached is not None and cached[0] == vis_node else encode_json(vis_node)
+                new_nodes[node_name] = (vis_node, frag)
+                node_frags.append(frag)
 
     # --- Связи из edges ---
-    vis_edges = []
-    for i, e in enumerate(edges):
-        t_type = str(e.get("transfer_type", "pq"))
-        d_type = str(e.get("data_type", "general"))
-        color = settings["colors"]["data_type"].get(d_type, "#cfcfcf")
-        tstyle = settings["colors"]["transfer_type"].get(t_type, {"dashes": False, "opacity": 1})
-        rgba = f"rgba({int(color[1:3],16)}, {int(color[3:5],16)}, {int(color[5:7],16)}, {tstyle['opacity']})"
-        vis_edges.append({
-            "id": f"edge_{i}_{e['from']}_{e['to']}",
-            "from": str(e["from"]),
-            "to": str(e["to"]),
-            "transfer": textify(e.get("transfer", [])),
-            "transfer_type": t_type,
-            "data_type": d_type,
-            "color": rgba,
-            "dashes": tstyle["dashes"],
-            "arrows": {"to": {"enabled": True, "type": "arrow", "scaleFactor": 0.8}},
-            "length": 250
-        })
-
-    # --- Добавляем связи из relations ---
-    for i, r in enumerate(relations):
-        vis_edges.append({
-            "id": f"rel_{i}_{r['from']}_{r['to']}",
-            "from": str(r["from"]),
-            "to": str(r["to"]),
-            "transfer": textify(r.get("connection", "")),
-            "transfer_type": "relation",
-            "data_type": r.get("process", ""),
-            "color": "rgba(139,195,74,0.8)",  # зелёные пунктирные линии
-            "dashes": True,
-            "arrows": {"to": {"enabled": True, "type": "arrow", "scaleFactor": 0.8}},
-            "length": 250
-        })
+    with stage(metrics, "edges"):
+        vis_edges, styles = [], edge_styles(settings)
+        for i, e in enumerate(model.edges):
+            t_type = e.transfer_type or "pq"
+            d_type = e.data_type or "general"
+            rgba, dashes = styles.resolve(d_type, t_type)
+            vis_edges.append({
+                "id": f"edge_{i}_{e.source}_{e.target}",
+                "from": e.source,
+                "to": e.target,
+                "transfer": e.transfer,
+                "transfer_type": t_type,
+                "data_type": d_type,
+                "color": rgba,
+                "dashes": dashes,
+                "arrows": {"to": {"enabled": True, "type": "arrow", "scaleFactor": 0.8}},
+                "length": 250
+            })
+
+        # --- Добавляем связи из relations ---
+        for i, r in enumerate(model.relations):
+            vis_edges.append({
+                "id": f"rel_{i}_{r.source}_{r.target}",
+                "from": r.source,
+                "to": r.target,
+                "transfer": r.connection,
+                "transfer_type": "relation",
+                "data_type": r.process,
+                "color": "rgba(139,195,74,0.8)",  # зелёные пунктирные линии
+                "dashes": True,
+                "arrows": {"to": {"enabled": True, "type": "arrow", "scaleFactor": 0.8}},
+                "length": 250
+            })
+
+    # --- Словари фильтров — по всем связям модели, в том числе свёрнутым в пучки ---
+    vocabulary = filter_vocabulary(vis_edges)
+
+    # --- Обзор по кластерам: детали узлов едут вместе с пачкой кластера ---
+    clusters_cfg, cluster_shards, cluster_of = {}, [], None
+    all_nodes = nodes
+    if overview is not None:
+        with stage(metrics, "clusters"):
+            vis_nodes, vis_edges, cluster_shards = build_overview(nodes, vis_nodes, vis_edges, by=overview)
+            by_name = {n.name: n for n in nodes}
+            cluster_of = {}
+            for shard in cluster_shards:
+                shard["details"] = {vn["id"]: node_details(by_name[vn["id"]]) for vn in shard["nodes"]}
+                cluster_of.update((vn["id"], shard["cluster"]) for vn in shard["nodes"])
+        clusters_cfg = {"base": clusters_base}
+        nodes, details_base = [], None
+
+    # --- Индексы страницы: фильтры одной пачкой, поиск по префиксам слов ---
+    with stage(metrics, "index"):
+        viewer_index = {
+            "filters": vocabulary,
+            # в overview связи на странице меняются при раскрытии кластеров — там фильтр идёт по edges.get()
+            "edges": edge_index(vis_edges) if overview is None else {},
+            "search": search_index(all_nodes, cluster_of),
+        }
 
     # --- Сохраняем node_data (для табличного отображения) ---
-    node_data = {}
-    for n in nodes:
-        columns = n.get("columns", [])
-        ordered_cols = []
-        for row in columns:
-            if isinstance(row, dict):
-                ordered_cols.append({str(k): str(v or "") for k, v in row.items()})
-            else:
-                ordered_cols.append({})
-        node_data[str(n.get("name", ""))] = {
-            "layer": str(n.get("layer", "")),
-            "type": str(n.get("type", "")),
-            "comment": str(n.get("comment", "")),
-            "columns": ordered_cols,
+    with stage(metrics, "details"):
+        node_data, shards, details_cfg = {}, [], {}
+        if fragments:
+            # без дельты детали пересчитываются все, с дельтой — только затронутые узлы
+            old_details = state.get("details", {}) if changes is not None else {}
+            dirty = set(changes["nodes"]["added"]) | set(changes["nodes"]["changed"]) if changes else set()
+            new_details = {}
+            for n in nodes:
+                name = n.name
+                frag = old_details.get(name) if name not in dirty else None
+                new_details[name] = frag if frag is not None else encode_json(node_details(n))
+        elif details_base is None:
+            for n in nodes:
+                node_data[n.name] = node_details(n)
+        else:
+            for start in range(0, len(nodes), DETAILS_PER_SHARD):
+                chunk = nodes[start:start + DETAILS_PER_SHARD]
+                shards.append({n.name: node_details(n) for n in chunk})
+            details_cfg = {"base": details_base}
+
+    # --- Формируем HTML: крупные JSON кодируются потоком при записи ---
+    with stage(metrics, "json_encode") as rec:
+        timers = (rec,) if encode_timer is None else (rec, encode_timer)
+        if fragments:
+            node_json = iter_json(new_details, fragments=True, timers=timers)
+            nodes_json = iter_json(node_frags, fragments=True, timers=timers)
+            state.update(layout=positions, nodes=new_nodes, details=new_details)
+        else:
+            node_json = iter_json(node_data, timers=timers)
+            nodes_json = iter_json(vis_nodes, timers=timers)
+        payloads = {
+            "__NODE_DATA__": node_json,
+            "__VIS_NODES__": nodes_json,
+            "__VIS_EDGES__": iter_json(vis_edges, timers=timers),
+            "__PHYSICS__": encode_json(physics_options(settings, positions)),
+            "__DETAILS__": encode_json(details_cfg),
+            "__CLUSTERS__": encode_json(clusters_cfg),
+            "__INDEX__": encode_json(viewer_index),
+            "__VIS_LIB__": vis_lib or vis_script_tag("cdn", OUTPUT),
+            "__SEARCH_LIB__": search_lib or search_lib_tags("cdn", OUTPUT),
         }
+        rec["chars"] = rec.get("chars", 0) + sum(len(v) for v in payloads.values() if isinstance(v, str))
+    return stream_template(tpl, payloads), shards, cluster_shards
+
+
+def write_shards(directory: pathlib.Path, shards, callback="__detailsShard"):
+    """Пачки в формате JSONP — грузятся через <script> и с file://, и с сервера."""
+    if directory.exists():
+        shutil.rmtree(directory)
+    directory.mkdir(parents=True)
+    for k, shard in enumerate(shards):
+        payload = encode_json(shard)
+        (directory / f"{k}.js").write_text(f"window.{callback}({k}, {payload});\n", encoding="utf-8")
+
+
+def _build_options(settings: dict, assets=None, compress=()):
+    """Режим подключения библиотек и форматы сжатия: аргументы или settings.build."""
+    build_cfg = settings.get("build") or {}
+    return assets or build_cfg.get("assets", "cdn"), tuple(compress or build_cfg.get("compress", ()))
+
+
+def is_current(output, model_hash: str, settings: dict, template=TEMPLATE, lazy=False, overview=None,
+               assets=None, compress=()) -> bool:
+    """True, если build() с теми же параметрами пропустит сборку, — проверка без загрузки модели."""
+    assets, compress = _build_options(settings, assets, compress)
+    tpl = pathlib.Path(template).read_text(encoding="utf-8")
+    return is_fresh(output, content_hash(model_hash, settings, tpl, CODE_HASH, lazy, overview, assets, compress))
+
+
+def build(data_model: dict, settings: dict = None, output=OUTPUT, template=TEMPLATE, force=False,
+          lazy=False, overview=None, metrics=None, model_hash=None, assets=None, compress=(), changes=None, base_hash=None,
+          keep_state=False) -> bool:
+    """
+    Генерирует HTML в output. Возвращает False, если модель, настройки
+    и шаблон не менялись с прошлой сборки и генерация была пропущена.
+    lazy=True: в страницу встраивается только граф, детали узлов (колонки)
+    пишутся в <output>_details/ и подгружаются по клику. Такая страница
+    должна открываться как файл или с сервера — во встраивании через
+    st.components.v1.html относительные пути не работают.
+    overview='layer' | 'layer_type': обзор из кластеров, узлы кластера
+    подгружаются из <output>_clusters/ по двойному клику (lazy не нужен).
+    metrics: если передан, в него пишутся замеры этапов (см. src/metrics.py).
+    model_hash: готовый хэш модели (например SHA-256 YAML из снимка) —
+    тогда модель не сериализуется заново ради ключа кэша. data_model может
+    быть и готовой src.model.Model — тогда model_hash обязателен.
+    assets='cdn' | 'inline' | 'local': откуда странице брать vis-network
+    (по умолчанию settings.build.assets или cdn); inline/local — без внешних запросов.
+    compress: ('gz', 'br') — рядом с HTML пишутся предсжатые копии.
+    changes: дельта относительно модели прошлой сборки этого же файла
+    (src.model_diff.diff_models) — пересчитываются только затронутые узлы.
+    base_hash: хэш модели, от которой считалась дельта; если прошлая сборка
+    файла была из другой модели, changes игнорируются (полный пересчёт).
+    keep_state=True: после сборки в памяти остаются раскладка и JSON-фрагменты
+    узлов (только для последнего такого файла) — без них changes не ускоряют
+    сборку; нужно редактору, остальным вызовам только тратит память.
+    Запись идёт под файловой блокировкой output, HTML заменяется атомарно.
+    """
+    if settings is None:
+        settings = load_settings()
+    assets, compress = _build_options(settings, assets, compress)
+    output = pathlib.Path(output)
+    tpl = pathlib.Path(template).read_text(encoding="utf-8")
+
+    if model_hash is None and isinstance(data_model, Model):
+        raise ValueError("Для готовой Model нужен model_hash")
+    with stage(metrics, "hash"):
+        digest = content_hash(model_hash or data_model, settings, tpl, CODE_HASH, lazy, overview, assets, compress)
+    if not force and is_fresh(output, digest):
+        return False
+
+    key = str(output.resolve())
+    if keep_state:
+        if key not in _render_state:
+            _render_state.clear()  # состояние держим только для одного файла
+        state = _render_state.setdefault(key, {})
+        if changes is not None and base_hash is not None and state.get("model_hash") != base_hash:
+            changes = None
+    else:
+        _render_state.pop(key, None)  # файл пересобран без состояния — прошлое ему больше не соответствует
+        state = None
+    shard_dir, cluster_dir = details_dir(output), clusters_dir(output)
+    encoded = {}
+    chunks, shards, cluster_shards = render_stream(
+        data_model, settings, tpl,
+        details_base=f"{shard_dir.name}/" if lazy else None,
+        overview=overview,
+        clusters_base=f"{cluster_dir.name}/",
+        metrics=metrics,
+        vis_lib=vis_script_tag(assets, output),
+        search_lib=search_lib_tags(assets, output),
+        changes=changes,
+        state=state,
+        encode_timer=encoded,
+    )
+    if state is not None:
+        state["model_hash"] = model_hash
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with file_lock(output):
+        with stage(metrics, "shards"):
+            for directory, payload, callback in (
+                (shard_dir, shards, "__detailsShard"),
+                (cluster_dir, cluster_shards, "__clusterShard"),
+            ):
+                if payload:
+                    write_shards(directory, payload, callback)
+                elif directory.exists():
+                    shutil.rmtree(directory)
+        with stage(metrics, "write") as rec:
+            # HTML и сжатые копии — одним проходом по кускам страницы, без сборки документа в строку
+            sizes = write_html(output, chunks, compress)
+            rec["bytes"] = sizes.pop("html")
+            if sizes:
+                rec["compressed_bytes"] = sizes
+        if "seconds" in rec:  # кодирование JSON при записи уже учтено в json_encode
+            rec["seconds"] = round(rec["seconds"] - encoded.get("seconds", 0), 4)
+        mark_built(output, digest)
+    return True
+
+
+def query_output(query: Query, output=OUTPUT) -> pathlib.Path:
+    """Файл фрагмента рядом с полным HTML: <имя>_q<ключ запроса>.html — свой кэш сборки на запрос."""
+    output = pathlib.Path(output)
+    return output.with_name(f"{output.stem}_q{query.slug()}{output.suffix}")
+
+
+def prune_query_outputs(output=OUTPUT, keep=QUERY_OUTPUT_LIMIT) -> int:
+    """
+    Удаляет старые фрагменты <имя>_q<ключ>.html вместе со спутниками (.hash,
+    .gz/.br, каталоги деталей и кластеров, .lock), кроме keep последних по
+    mtime. Возвращает число удалённых фрагментов.
+    """
+    output = pathlib.Path(output)
+    pattern = f"{output.stem}_q{'?' * 12}{output.suffix}"
+    with file_lock(output.with_name(f"{output.stem}_q")):  # одна чистка за раз
+        found = []
+        for f in output.parent.glob(pattern):
+            try:
+                found.append((f.stat().st_mtime, f))
+            except FileNotFoundError:
+                continue
+        found.sort(reverse=True)
+        for _, old in found[keep:]:
+            with file_lock(old):
+                for f in (old, stamp_path(old), *(old.with_name(f"{old.name}.{fmt}") for fmt in COMPRESS_FORMATS)):
+                    f.unlink(missing_ok=True)
+                for directory in (details_dir(old), clusters_dir(old)):
+                    shutil.rmtree(directory, ignore_errors=True)
+            lock_path(old).unlink(missing_ok=True)
+    return max(0, len(found) - keep)
+
+
+def discover_models(models_dir, out_dir) -> list:
+    """Модели каталога (*.yaml/*.yml, кроме settings и скрытых): [{"model", "output"}]."""
+    jobs = []
+    for path in sorted(pathlib.Path(models_dir).iterdir()):
+        if path.suffix in (".yaml", ".yml") and path.name != SETTINGS_FILE.name and not path.name.startswith("."):
+            jobs.append({"model": path, "output": pathlib.Path(out_dir) / f"{path.stem}.html"})
+    return jobs
+
+
+def build_file(model_path, output=None, settings=None, force=False, lazy=False, overview=None,
+               assets=None, compress=()) -> dict:
+    """
+    Сборка одной модели из YAML-файла — единица работы пакетной сборки
+    (run_pipeline.py). Исключения не пробрасываются: результат содержит
+    status 'built' | 'skipped' | 'failed' и текст ошибки.
+    """
+    model_path = pathlib.Path(model_path)
+    output = pathlib.Path(output) if output else OUTPUT.with_name(f"{model_path.stem}.html")
+    result = {"model": str(model_path), "output": str(output)}
+    settings = settings if settings is not None else load_settings()
+    metrics = from_settings(f"generate_html:{model_path.name}", settings)
+    try:
+        # актуальность — по хэшу файла, без разбора YAML
+        if not force and is_current(output, file_hash(model_path), settings, lazy=lazy, overview=overview,
+                                    assets=assets, compress=compress):
+            result["status"] = "skipped"
+            return result
+        with stage(metrics, "load_yaml"):
+            data_model, model_hash = load_with_hash(model_path)
+        rebuilt = build(data_model or {}, settings, output=output, force=force, lazy=lazy,
+                        overview=overview, metrics=metrics, model_hash=model_hash,
+                        assets=assets, compress=compress)
+        result["status"] = "built" if rebuilt else "skipped"
+        if metrics is not None and rebuilt:
+            metrics.append_to()
+    except Exception as e:
+        result["status"] = "failed"
+        result["error"] = f"{type(e).__name__}: {e}"
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Генерация HTML-визуализации модели данных")
+    parser.add_argument("--lazy", action="store_true",
+                        help="детали узлов в отдельных файлах, подгрузка по клику")
+    parser.add_argument("--overview", choices=CLUSTER_MODES,
+                        help="обзор из кластеров по слою или слою+типу, раскрытие двойным кликом")
+    parser.add_argument("--assets", choices=ASSET_MODES,
+                        help="vis-network: cdn, inline (внутри HTML) или local (копия рядом с HTML)")
+    parser.add_argument("--compress", nargs="+", choices=COMPRESS_FORMATS, default=(),
+                        help="записать предсжатые копии HTML (.gz, .br)")
+    parser.add_argument("--force", action="store_true", help="пересобрать, даже если ничего не изменилось")
+    query_args = parser.add_argument_group("фрагмент модели (пишется в build/<имя>_q<ключ>.html)")
+    query_args.add_argument("--root", help="корневой узел фрагмента")
+    query_args.add_argument("--up", type=int, help="шагов вверх от корня (по умолчанию вся цепочка)")
+    query_args.add_argument("--down", type=int, help="шагов вниз от корня (по умолчанию вся цепочка)")
+    query_args.add_argument("--layer", nargs="+", default=(), help="только узлы этих слоёв")
+    query_args.add_argument("--type", nargs="+", default=(), help="только узлы этих типов")
+    query_args.add_argument("--data-type", nargs="+", default=(), help="только связи с этими data_type")
+    query_args.add_argument("--transfer-type", nargs="+", default=(), help="только связи с этими transfer_type")
+    args = parser.parse_args(argv)
+    if (args.up is not None or args.down is not None) and not args.root:
+        parser.error("--up/--down требуют --root")
+    query = make_query(args.root, args.up, args.down, args.layer, args.type, args.data_type, args.transfer_type)
+
+    settings = load_settings()
+    metrics = from_settings("generate_html", settings)
+    store_path = sqlite_path(settings)
+    output = OUTPUT if query.is_empty() else query_output(query)
+
+    # --- Актуальность HTML — по хэшу, до чтения модели ---
+    with stage(metrics, "check_fresh"):
+        if store_path is not None:
+            with ModelStore(store_path) as store:
+                source_hash = store.model_hash()
+        else:
+            source_hash = file_hash(YAML_FILE)
+        model_hash = source_hash if query.is_empty() else content_hash(source_hash, list(query))
+    if not args.force and is_current(output, model_hash, settings, lazy=args.lazy, overview=args.overview,
+                                     assets=args.assets, compress=args.compress):
+        if not query.is_empty():
+            with contextlib.suppress(FileNotFoundError):
+                os.utime(output)  # фрагмент снова запрошен — при чистке он среди последних
+        print(f"⏭️ Без изменений, HTML актуален: {output.resolve()}")
+        return 0
+
+    try:
+        if store_path is not None:
+            # SQLite: фрагмент читается из базы по индексам, вся модель — только для полного графа
+            with ModelStore(store_path) as store, stage(metrics, "load_sqlite"):
+                if query.is_empty():
+                    data_model, source_hash = store.load_with_hash()
+                else:
+                    source_hash = store.model_hash()
+                    data_model = store.extract(query)
+        else:
+            with stage(metrics, "load_yaml"):
+                data_model, source_hash = load_with_hash(YAML_FILE)
+            if not query.is_empty():
+                with stage(metrics, "subgraph"):
+                    data_model = cached_extract(source_hash, data_model, query)
+    except KeyError as e:
+        print(f"❌ {e.args[0]}")
+        return 1
+    # модель могла измениться между проверкой и чтением — ключ кэша по прочитанной версии
+    model_hash = source_hash if query.is_empty() else content_hash(source_hash, list(query))
+    model = Model(data_model)
+    rebuilt = build(model, settings, output=output, force=args.force, lazy=args.lazy, overview=args.overview,
+                    metrics=metrics, model_hash=model_hash, assets=args.assets, compress=args.compress)
+    if metrics is not None and rebuilt:
+        metrics.append_to()
+    if not rebuilt:
+        print(f"⏭️ Без изменений, HTML актуален: {output.resolve()}")
+        return 0
 
-    # --- Формируем HTML ---
-    html = tpl.replace("__NODE_DATA__", json.dumps(node_data, ensure_ascii=False))
-    html = html.replace("__VIS_NODES__", json.dumps(vis_nodes, ensure_ascii=False))
-    html = html.replace("__VIS_EDGES__", json.dumps(vis_edges, ensure_ascii=False))
+    if not query.is_empty():
+        prune_query_outputs()
+    n_edges = len(model.edges) + len(model.relations)
+    print(f"✅ Сгенерировано: {output.resolve()}")
+    print(f"📊 Узлов: {len(model.nodes)} | Связей: {n_edges}")
+    if model.problems:
+        print(f"⚠️ Проблем в модели: {len(model.problems)}")
+        for problem in model.problems[:10]:
+            print(f"   • {problem}")
 
-    pathlib.Path(OUTPUT).write_text(html, encoding="utf-8")
-    print(f"✅ Сгенерировано: {pathlib.Path(OUTPUT).resolve()}")
-    print(f"📊 Узлов: {len(vis_nodes)} | Связей: {len(vis_edges)}")
+    cycles = GraphIndex(data_model).find_cycles()
+    if cycles:
+        print(f"⚠️ Циклов в потоках данных: {len(cycles)} (например: {' → '.join(cycles[0])})")
+    return 0
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
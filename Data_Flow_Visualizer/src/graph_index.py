@@ -0,0 +1,143 @@
+"""Индекс графа модели: узлы по имени, смежность и запросы происхождения (lineage)."""
+from collections import deque
+
+
+class GraphIndex:
+    """
+    Строится один раз на модель. Смежность хранится отдельно для edges
+    и relations; обход вверх/вниз по цепочке мемоизируется, поэтому
+    повторные запросы к одному узлу бесплатны. Возвращаемые словари
+    и списки — из кэша, изменять их нельзя.
+    """
+
+    def __init__(self, data_model: dict):
+        self.nodes = {}
+        self.out_edges, self.in_edges = {}, {}
+        self.out_relations, self.in_relations = {}, {}
+        self._lineage_cache = {}
+
+        for n in data_model.get("nodes", []):
+            self.nodes[str(n.get("name", ""))] = n
+        self._index_links(data_model.get("edges", []), self.out_edges, self.in_edges)
+        self._index_links(data_model.get("relations", []), self.out_relations, self.in_relations)
+
+    @staticmethod
+    def _index_links(links, outgoing, incoming):
+        for link in links:
+            src, dst = str(link.get("from", "")), str(link.get("to", ""))
+            if src:
+                outgoing.setdefault(src, []).append(link)
+            if dst:
+                incoming.setdefault(dst, []).append(link)
+
+    # --------- Соседи ---------
+    def node(self, name):
+        return self.nodes.get(name)
+
+    def degree(self, name) -> int:
+        """Число концов связей (edges + relations) у узла."""
+        return (
+            len(self.out_edges.get(name, ())) + len(self.in_edges.get(name, ()))
+            + len(self.out_relations.get(name, ())) + len(self.in_relations.get(name, ()))
+        )
+
+    def successors(self, name, relations=False) -> list:
+        links = self.out_edges.get(name, [])
+        if relations:
+            links = links + self.out_relations.get(name, [])
+        return [str(link["to"]) for link in links]
+
+    def predecessors(self, name, relations=False) -> list:
+        links = self.in_edges.get(name, [])
+        if relations:
+            links = links + self.in_relations.get(name, [])
+        return [str(link["from"]) for link in links]
+
+    # --------- Происхождение ---------
+    def _walk(self, name, step, depth, relations) -> dict:
+        """BFS от узла: {имя: расстояние в шагах}, сам узел не включается."""
+        seen = {name: 0}
+        queue = deque([name])
+        while queue:
+            current = queue.popleft()
+            dist = seen[current]
+            if depth is not None and dist >= depth:
+                continue
+            for nxt in step(current, relations):
+                if nxt not in seen:
+                    seen[nxt] = dist + 1
+                    queue.append(nxt)
+        del seen[name]
+        return seen
+
+    def upstream(self, name, depth=None, relations=False) -> dict:
+        """Все источники узла (транзитивно) с расстоянием; depth ограничивает число шагов."""
+        key = ("up", name, depth, relations)
+        if key not in self._lineage_cache:
+            self._lineage_cache[key] = self._walk(name, self.predecessors, depth, relations)
+        return self._lineage_cache[key]
+
+    def downstream(self, name, depth=None, relations=False) -> dict:
+        """Все потребители узла (транзитивно) с расстоянием; depth ограничивает число шагов."""
+        key = ("down", name, depth, relations)
+        if key not in self._lineage_cache:
+            self._lineage_cache[key] = self._walk(name, self.successors, depth, relations)
+        return self._lineage_cache[key]
+
+    def impact(self, name, depth=None, relations=False) -> list:
+        """
+        Анализ влияния: кого затронет изменение узла.
+        Список уровней [[узлы на 1 шаге], [на 2 шагах], ...].
+        """
+        levels = []
+        for other, dist in self.downstream(name, depth, relations).items():
+            while len(levels) < dist:
+                levels.append([])
+            levels[dist - 1].append(other)
+        return levels
+
+    def find_cycles(self, relations=False) -> list:
+        """Циклы в графе: компоненты сильной связности из 2+ узлов и петли (Тарьян, без рекурсии)."""
+        index, low, on_stack = {}, {}, set()
+        stack, cycles = [], []
+        counter = 0
+        names = set(self.nodes) | set(self.out_edges) | set(self.in_edges)
+        if relations:
+            names |= set(self.out_relations) | set(self.in_relations)
+
+        for root in sorted(names):
+            if root in index:
+                continue
+            work = [(root, iter(self.successors(root, relations)))]
+            index[root] = low[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack.add(root)
+            while work:
+                node, children = work[-1]
+                for child in children:
+                    if child not in index:
+                        index[child] = low[child] = counter
+                        counter += 1
+                        stack.append(child)
+                        on_stack.add(child)
+                        work.append((child, iter(self.successors(child, relations))))
+                        break
+                    if child in on_stack:
+                        low[node] = min(low[node], index[child])
+                else:
+                    work.pop()
+                    if work:
+                        parent = work[-1][0]
+                        low[parent] = min(low[parent], low[node])
+                    if low[node] == index[node]:
+                        component = []
+                        while True:
+                            member = stack.pop()
+                            on_stack.discard(member)
+                            component.append(member)
+                            if member == node:
+                                break
+                        if len(component) > 1 or node in self.successors(node, relations):
+                            cycles.append(component[::-1])
+        return cycles
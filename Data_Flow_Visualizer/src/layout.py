@@ -0,0 +1,243 @@
+"""Предварительный расчёт координат узлов (вместо physics в браузере)."""
+import math
+
+# Порядок слоёв слева направо; неизвестные слои идут после, по алфавиту
+LAYER_ORDER = ["Infrastructure", "Data", "Application", "Business", "Reporting"]
+
+LAYER_GAP = 350   # расстояние между колонками слоёв, px
+NODE_GAP = 110    # расстояние между узлами внутри слоя, px
+FORCE_SPACING = 160  # идеальная длина связи в force-раскладке, px
+FORCE_CELL = 1.0     # ячейка нижнего уровня сетки отталкивания, в идеальных длинах связи
+FORCE_EXACT_NODES = 1000  # до стольких узлов отталкивание считается точно по всем парам (так быстрее)
+FORCE_BLOCK = 512    # размер блока при точном расчёте отталкивания (ограничивает память)
+
+
+def _layer_rank(layers, order=None):
+    order = order or LAYER_ORDER
+    known = [layer for layer in order if layer in layers]
+    extra = sorted(layer for layer in layers if layer not in order)
+    return {layer: i for i, layer in enumerate(known + extra)}
+
+
+def layered_layout(nodes, links, order=None) -> dict:
+    """
+    Иерархическая раскладка по слоям: каждый слой — колонка.
+    Внутри колонки узлы упорядочены по барицентру соседей из предыдущих слоёв,
+    чтобы уменьшить число пересечений.
+    nodes: [(name, layer)], links: [(from, to)]
+    order: порядок слоёв слева направо (по умолчанию LAYER_ORDER)
+    """
+    rank = _layer_rank({layer for _, layer in nodes}, order)
+    columns = {}
+    for name, layer in nodes:
+        columns.setdefault(rank[layer], []).append(name)
+
+    neighbours = {}
+    for a, b in links:
+        neighbours.setdefault(a, []).append(b)
+        neighbours.setdefault(b, []).append(a)
+
+    positions = {}
+    for col in sorted(columns):
+        names = columns[col]
+        placed_y = {}
+        for name in names:
+            ys = [positions[m][1] for m in neighbours.get(name, ()) if m in positions]
+            placed_y[name] = sum(ys) / len(ys) if ys else math.inf
+        # стабильная сортировка: узлы без соседей слева сохраняют исходный порядок
+        names = sorted(names, key=lambda nm: placed_y[nm])
+        offset = (len(names) - 1) * NODE_GAP / 2
+        for i, name in enumerate(names):
+            positions[name] = (col * LAYER_GAP, i * NODE_GAP - offset)
+    return positions
+
+
+def force_layout(nodes, links, iterations=200, init=None, seed=0) -> dict:
+    """
+    Векторизованная силовая раскладка (Fruchterman–Reingold) на NumPy.
+    Отталкивание на больших графах — приближение Barnes–Hut на многоуровневой
+    сетке (см. repel_grid): итерация O(N log N) вместо O(N²) по всем парам;
+    до FORCE_EXACT_NODES узлов — точно, блоками по FORCE_BLOCK строк.
+    init: необязательные стартовые координаты {name: (x, y)}.
+    """
+    import numpy as np
+
+    names = [name for name, _ in nodes]
+    n = len(names)
+    if n == 0:
+        return {}
+    idx = {name: i for i, name in enumerate(names)}
+    pairs = np.array(
+        [(idx[a], idx[b]) for a, b in links if a in idx and b in idx and a != b],
+        dtype=np.int64,
+    ).reshape(-1, 2)
+
+    rng = np.random.default_rng(seed)
+    pos = (rng.random((n, 2)) * math.sqrt(n)).astype(np.float32)
+    if init:
+        for name, (x, y) in init.items():
+            if name in idx:
+                pos[idx[name]] = (x / FORCE_SPACING, y / FORCE_SPACING)
+
+    k2 = 1.0  # идеальное расстояние в единичных координатах (k = 1)
+    t0 = max(math.sqrt(n) / 10, 1.0)
+    disp = np.empty_like(pos)
+    for it in range(iterations):
+        # --- отталкивание: k² / d ---
+        if n <= FORCE_EXACT_NODES:
+            repel_exact(pos, disp, k2)
+        else:
+            disp[:] = 0
+            repel_grid(pos, disp, k2)
+
+        # --- притяжение по связям: d² / k ---
+        if len(pairs):
+            delta = pos[pairs[:, 0]] - pos[pairs[:, 1]]
+            dist = np.sqrt(np.einsum("ij,ij->i", delta, delta))
+            force = delta * dist[:, None]
+            np.subtract.at(disp, pairs[:, 0], force)
+            np.add.at(disp, pairs[:, 1], force)
+
+        # --- шаг, ограниченный «температурой» ---
+        t = t0 * (1 - it / iterations)
+        length = np.sqrt(np.einsum("ij,ij->i", disp, disp))
+        np.maximum(length, 1e-9, out=length)
+        pos += disp * (np.minimum(length, t) / length)[:, None]
+
+    pos -= pos.mean(axis=0)
+    pos *= FORCE_SPACING
+    return {name: (float(pos[i, 0]), float(pos[i, 1])) for i, name in enumerate(names)}
+
+
+def repel_exact(pos, disp, k2):
+    """Отталкивание k² / d по всем парам; записывается в disp."""
+    import numpy as np
+
+    xs, ys = pos[:, 0], pos[:, 1]
+    for start in range(0, len(pos), FORCE_BLOCK):
+        dx = xs[start:start + FORCE_BLOCK, None] - xs[None, :]
+        dy = ys[start:start + FORCE_BLOCK, None] - ys[None, :]
+        inv = dx * dx
+        inv += dy * dy
+        np.maximum(inv, 1e-4, out=inv)
+        np.divide(k2, inv, out=inv)
+        disp[start:start + FORCE_BLOCK, 0] = (dx * inv).sum(axis=1)
+        disp[start:start + FORCE_BLOCK, 1] = (dy * inv).sum(axis=1)
+
+
+def repel_grid(pos, disp, k2):
+    """
+    Отталкивание k² / d, прибавляется к disp. Сетка из квадратных ячеек
+    FORCE_CELL; узлы своей и 8 соседних ячеек отталкиваются точно.
+    Дальше уровни по удвоению ячейки: ячейка отталкивается как одна точка
+    (центр масс, вес — число узлов) от ячеек, что лежат в окрестности её
+    родителя, но не соседствуют с ней, — до 27 на уровень, каждая не ближе
+    своего размера (как Barnes–Hut с θ ≈ 1). Сила на ячейку достаётся всем её узлам.
+    """
+    import numpy as np
+
+    n = len(pos)
+    cell = ((pos - pos.min(axis=0)) / FORCE_CELL).astype(np.int64)
+
+    # --- ближняя зона: пары из соседних ячеек нижнего уровня ---
+    width = int(cell[:, 1].max()) + 3  # с полем в ячейку: соседи не переходят на другую строку
+    key = (cell[:, 0] + 1) * width + cell[:, 1] + 1
+    order = np.argsort(key, kind="stable")
+    sorted_key = key[order]
+    for near in (key + dx * width + dy for dx in (-1, 0, 1) for dy in (-1, 0, 1)):
+        lo = np.searchsorted(sorted_key, near, "left")
+        count = np.searchsorted(sorted_key, near, "right") - lo
+        total = int(count.sum())
+        if not total:
+            continue
+        # пары (i, j): j пробегает узлы ячейки near[i] — позиции lo[i] … lo[i] + count[i] - 1 в order
+        i = np.repeat(np.arange(n), count)
+        j = order[np.repeat(lo - (np.cumsum(count) - count), count) + np.arange(total)]
+        delta = pos[i] - pos[j]
+        d2 = np.einsum("ij,ij->i", delta, delta)
+        np.maximum(d2, 1e-4, out=d2)
+        scale = np.where(i != j, k2 / d2, 0)
+        disp[:, 0] += np.bincount(i, weights=delta[:, 0] * scale, minlength=n)
+        disp[:, 1] += np.bincount(i, weights=delta[:, 1] * scale, minlength=n)
+
+    # --- дальняя зона: ячейка на ячейку по уровням, пока окрестность родителя не накроет всё ---
+    offsets = np.arange(-2, 4)  # дети ячеек parent-1 … parent+1
+    ox = np.repeat(offsets, len(offsets))[None, :]
+    oy = np.tile(offsets, len(offsets))[None, :]
+    of_node = np.arange(n)  # номер ячейки уровня для каждого узла
+    coords = cell
+    while True:
+        width = int(coords[:, 1].max()) + 6
+        cells, inverse, counts = np.unique((coords[:, 0] + 2) * width + coords[:, 1] + 2,
+                                           return_inverse=True, return_counts=True)
+        of_node = inverse[of_node]
+        cell_xy = np.empty((len(cells), 2), dtype=np.int64)
+        cell_xy[inverse] = coords
+        centre = np.empty((len(cells), 2))
+        weight = np.bincount(of_node, minlength=len(cells))
+        centre[:, 0] = np.bincount(of_node, weights=pos[:, 0], minlength=len(cells)) / weight
+        centre[:, 1] = np.bincount(of_node, weights=pos[:, 1], minlength=len(cells)) / weight
+        parent = cell_xy >> 1
+        xs = 2 * parent[:, 0, None] + ox
+        ys = 2 * parent[:, 1, None] + oy
+        far = (np.abs(xs - cell_xy[:, 0, None]) > 1) | (np.abs(ys - cell_xy[:, 1, None]) > 1)
+        target = (xs + 2) * width + ys + 2
+        found = np.minimum(np.searchsorted(cells, target), len(cells) - 1)
+        rows, cols = np.nonzero(far & (cells[found] == target))
+        hit = found[rows, cols]
+        delta = centre[rows] - centre[hit]
+        d2 = np.einsum("ij,ij->i", delta, delta)
+        scale = weight[hit] * k2 / d2
+        # сила на ячейку — всем её узлам
+        disp[:, 0] += np.bincount(rows, weights=delta[:, 0] * scale, minlength=len(cells))[of_node]
+        disp[:, 1] += np.bincount(rows, weights=delta[:, 1] * scale, minlength=len(cells))[of_node]
+        if parent.max() <= 1:  # все родители в одном квадрате 2×2 — дальних ячеек выше нет
+            break
+        coords = parent
+
+
+def compute_layout(nodes, links, mode="layered", iterations=200, order=None) -> dict:
+    """Координаты {name: (x, y)} для режима 'layered' или 'force'."""
+    if mode == "layered":
+        return layered_layout(nodes, links, order)
+    if mode == "force":
+        # стартуем из послойной раскладки — сходится быстрее и детерминированно
+        return force_layout(nodes, links, iterations=iterations, init=layered_layout(nodes, links, order))
+    raise ValueError(f"Неизвестный режим раскладки: {mode}")
+
+
+def extend_layout(previous, nodes, links, mode="layered"):
+    """
+    Дополняет прошлую раскладку после дельта-правки: узлы, что уже были,
+    остаются на своих местах, новые ставятся в низ колонки своего слоя
+    ('layered') или в центр соседей ('force').
+    Возвращает None, если так нельзя (появился новый слой) — тогда нужна полная раскладка.
+    """
+    positions = {name: tuple(previous[name]) for name, _ in nodes if name in previous}
+    new = [(name, layer) for name, layer in nodes if name not in positions]
+    if not new:
+        return positions
+    old_layers = {layer for name, layer in nodes if name in positions}
+    if mode == "layered" and any(layer not in old_layers for _, layer in new):
+        return None
+
+    rank = _layer_rank({layer for _, layer in nodes})
+    bottoms = {}
+    for x, y in positions.values():
+        bottoms[x] = max(bottoms.get(x, y), y)
+    neighbours = {}
+    for a, b in links:
+        neighbours.setdefault(a, []).append(b)
+        neighbours.setdefault(b, []).append(a)
+
+    for name, layer in new:
+        near = [positions[m] for m in neighbours.get(name, ()) if m in positions]
+        if mode == "force" and near:
+            x = sum(p[0] for p in near) / len(near) + NODE_GAP / 2
+            y = sum(p[1] for p in near) / len(near) + NODE_GAP / 2
+        else:
+            x = rank[layer] * LAYER_GAP
+            y = bottoms.get(x, -NODE_GAP) + NODE_GAP
+            bottoms[x] = y
+        positions[name] = (x, y)
+    return positions
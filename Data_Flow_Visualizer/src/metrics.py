@@ -0,0 +1,85 @@
+"""Замеры этапов сборки: время, пиковая память, размер результата."""
+import datetime
+import json
+import pathlib
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+BASE = pathlib.Path(__file__).resolve().parent.parent
+BUILD_LOG = BASE / "docs" / "build_log.txt"
+
+
+class Metrics:
+    """
+    Записи по этапам одного запуска (сборка HTML, импорт Excel и т.п.).
+    Память меряется только при trace_memory=True: tracemalloc заметно
+    замедляет Python-код, поэтому по умолчанию он выключен.
+    Вложенные этапы не поддерживаются — пик памяти сбрасывается на каждом.
+    """
+
+    def __init__(self, run: str, trace_memory=False):
+        self.run = run
+        self.trace_memory = trace_memory
+        self.stages = []
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str):
+        """Замер этапа; в отданный словарь можно дописать "bytes" и другие поля."""
+        rec = {"stage": name}
+        own_trace = self.trace_memory and not tracemalloc.is_tracing()
+        if own_trace:
+            tracemalloc.start()
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            yield rec
+        finally:
+            rec["seconds"] = round(time.perf_counter() - start, 4)
+            if self.trace_memory:
+                rec["peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 2**20, 2)
+            if own_trace:
+                tracemalloc.stop()
+            self.stages.append(rec)
+
+    def record(self) -> dict:
+        return {
+            "at": datetime.datetime.now().isoformat(timespec="seconds"),
+            "run": self.run,
+            "total_seconds": round(time.perf_counter() - self._started, 4),
+            "stages": self.stages,
+        }
+
+    def append_to(self, path=BUILD_LOG):
+        """Дописывает запись одной JSON-строкой в журнал сборки."""
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(self.record(), ensure_ascii=False) + "\n")
+
+
+def stage(metrics, name: str):
+    """metrics.stage(name) или пустой контекст, если замеры выключены (metrics=None)."""
+    return metrics.stage(name) if metrics is not None else nullcontext({})
+
+
+def from_settings(run: str, settings: dict):
+    """Metrics по секции settings.metrics или None, если замеры выключены."""
+    cfg = settings.get("metrics") or {}
+    if not cfg.get("enabled", False):
+        return None
+    return Metrics(run, trace_memory=bool(cfg.get("trace_memory", False)))
+
+
+def read_log(path=BUILD_LOG, limit=50) -> list:
+    """Последние записи журнала (строки не в формате JSON пропускаются)."""
+    path = pathlib.Path(path)
+    if not path.exists():
+        return []
+    records = []
+    for line in path.read_text(encoding="utf-8").splitlines()[-limit:]:
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            continue
+    return records
@@ -0,0 +1,142 @@
+"""
+Типизированное ядро модели: компактные записи со __slots__, интернированные
+строки и проверка ссылок за один проход. Общее для обоих генераторов.
+"""
+import sys
+
+_intern = sys.intern
+
+
+def text(value) -> str:
+    """None → "", остальное — str."""
+    return "" if value is None else str(value)
+
+
+def text_tree(value):
+    """Текст во всех листьях вложенных списков/словарей (поле transfer у связей)."""
+    if isinstance(value, dict):
+        return {str(k): text_tree(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [text_tree(v) for v in value]
+    return text(value)
+
+
+# одинаковые наборы ключей колонок хранятся одним кортежем на всю модель
+_column_keys = {}
+
+
+class Column:
+    """Строка таблицы колонок узла: общий кортеж ключей + кортеж значений."""
+
+    __slots__ = ("keys", "values")
+
+    def __init__(self, row):
+        if not isinstance(row, dict):
+            row = {}
+        keys = tuple(row)
+        shared = _column_keys.get(keys)
+        if shared is None:
+            shared = _column_keys[keys] = tuple(_intern(str(k)) for k in keys)
+        self.keys = shared
+        self.values = tuple(str(v or "") for v in row.values())
+
+    def get(self, key, default=""):
+        try:
+            return self.values[self.keys.index(key)]
+        except ValueError:
+            return default
+
+    def as_dict(self) -> dict:
+        return dict(zip(self.keys, self.values))
+
+
+class Node:
+    __slots__ = ("name", "layer", "type", "comment", "columns")
+
+    def __init__(self, raw: dict):
+        self.name = _intern(text(raw.get("name")))
+        self.layer = _intern(text(raw.get("layer")))
+        self.type = _intern(text(raw.get("type")))
+        self.comment = text(raw.get("comment"))
+        self.columns = tuple(Column(row) for row in raw.get("columns") or ())
+
+
+class Edge:
+    __slots__ = ("source", "target", "transfer_type", "data_type", "transfer")
+
+    def __init__(self, raw: dict):
+        self.source = _intern(text(raw.get("from")))
+        self.target = _intern(text(raw.get("to")))
+        self.transfer_type = _intern(text(raw.get("transfer_type")))
+        self.data_type = _intern(text(raw.get("data_type")))
+        self.transfer = text_tree(raw.get("transfer") or [])
+
+
+class Relation:
+    __slots__ = ("source", "target", "connection", "process", "comment")
+
+    def __init__(self, raw: dict):
+        self.source = _intern(text(raw.get("from")))
+        self.target = _intern(text(raw.get("to")))
+        self.connection = text(raw.get("connection"))
+        self.process = _intern(text(raw.get("process")))
+        self.comment = text(raw.get("comment"))
+
+
+class Model:
+    """
+    Модель из разобранного YAML. Сборка записей и проверка идут одним
+    проходом по каждому списку: повторы имён, связи на несуществующие узлы
+    (поиск по множеству имён) и степень узлов (edges + relations).
+    problems — список найденных проблем, сборку они не останавливают.
+    """
+
+    __slots__ = ("nodes", "edges", "relations", "names", "degree", "problems")
+
+    def __init__(self, data_model: dict):
+        self.nodes, self.edges, self.relations = [], [], []
+        self.names, self.degree, self.problems = set(), {}, []
+
+        for raw in data_model.get("nodes") or ():
+            node = Node(raw)
+            if node.name in self.names:
+                self.problems.append(f"повтор узла: {node.name}")
+            self.names.add(node.name)
+            self.nodes.append(node)
+
+        for kind, records, cls in (("edge", self.edges, Edge), ("relation", self.relations, Relation)):
+            for raw in data_model.get(f"{kind}s") or ():
+                link = cls(raw)
+                for end in (link.source, link.target):
+                    if end not in self.names:
+                        self.problems.append(f"{kind} {link.source} → {link.target}: нет узла {end!r}")
+                    self.degree[end] = self.degree.get(end, 0) + 1
+                records.append(link)
+
+    def links(self):
+        """Пары (from, to) всех связей — для раскладки."""
+        return [(e.source, e.target) for e in self.edges] + [(r.source, r.target) for r in self.relations]
+
+
+class StyleTable:
+    """
+    Цвет rgba и пунктир связи по (data_type, transfer_type). Hex-цвет
+    разбирается один раз на пару, а не для каждой связи.
+    """
+
+    def __init__(self, colors: dict, styles: dict, default_color="#cfcfcf", default_style=None):
+        self.colors = colors
+        self.styles = styles
+        self.default_color = default_color
+        self.default_style = default_style or {"dashes": False, "opacity": 1}
+        self._resolved = {}
+
+    def resolve(self, data_type: str, transfer_type: str):
+        key = (data_type, transfer_type)
+        style = self._resolved.get(key)
+        if style is None:
+            color = self.colors.get(data_type, self.default_color)
+            tstyle = self.styles.get(transfer_type, self.default_style)
+            rgba = f"rgba({int(color[1:3],16)}, {int(color[3:5],16)}, {int(color[5:7],16)}, {tstyle['opacity']})"
+            style = self._resolved[key] = (rgba, tstyle["dashes"])
+        return style
@@ -0,0 +1,90 @@
+"""Сравнение двух версий модели и применение изменений (дельта вместо полной замены)."""
+
+SECTIONS = ("nodes", "edges", "relations")
+
+
+def _norm(value):
+    """Значение в виде, который переживает круг YAML → Excel → YAML."""
+    if value is None:
+        return ""
+    if isinstance(value, dict):
+        return {str(k): v for k, v in ((k, _norm(v)) for k, v in value.items()) if v not in ("", [])}
+    if isinstance(value, list) and all(isinstance(v, dict) for v in value):
+        return [_norm(v) for v in value]
+    return str(value)
+
+
+def record_key(section: str, rec: dict):
+    """Ключ записи: имя узла; для связей — концы и тип (повторы различаются номером)."""
+    if section == "nodes":
+        return str(rec.get("name", ""))
+    if section == "edges":
+        return tuple(str(rec.get(k, "")) for k in ("from", "to", "transfer_type", "data_type"))
+    return tuple(str(rec.get(k, "")) for k in ("from", "to", "connection"))
+
+
+def keyed(section: str, records) -> dict:
+    """{ключ: запись}; повтор ключа связи получает номер вхождения: (..., 1), (..., 2)."""
+    result, seen = {}, {}
+    for rec in records:
+        key = record_key(section, rec)
+        if section != "nodes":
+            n = seen[key] = seen.get(key, -1) + 1
+            key = key + (n,) if n else key
+        result[key] = rec
+    return result
+
+
+def diff_models(old: dict, new: dict) -> dict:
+    """
+    {section: {"added": [ключи], "removed": [ключи], "changed": [ключи]}}
+    для nodes / edges / relations. Пустые значения и отсутствующие поля
+    считаются равными, числа сравниваются как строки — как после Excel.
+    """
+    diff = {}
+    for section in SECTIONS:
+        before = keyed(section, old.get(section) or [])
+        after = keyed(section, new.get(section) or [])
+        diff[section] = {
+            "added": [k for k in after if k not in before],
+            "removed": [k for k in before if k not in after],
+            "changed": [k for k in after if k in before and _norm(after[k]) != _norm(before[k])],
+        }
+    return diff
+
+
+def is_empty(diff: dict) -> bool:
+    return not any(keys for section in diff.values() for keys in section.values())
+
+
+def summary(diff: dict) -> list:
+    """Строки для таблицы изменений: раздел, добавлено / удалено / изменено."""
+    return [
+        {
+            "раздел": section,
+            "добавлено": len(diff[section]["added"]),
+            "удалено": len(diff[section]["removed"]),
+            "изменено": len(diff[section]["changed"]),
+        }
+        for section in SECTIONS
+    ]
+
+
+def apply_diff(old: dict, new: dict, diff: dict) -> dict:
+    """
+    Новая модель на основе old: неизменённые записи остаются теми же
+    объектами и на своих местах, изменённые заменяются записями из new,
+    удалённые выбрасываются, добавленные дописываются в конец в порядке new.
+    old может быть новее модели, от которой считалась дельта (правка другого
+    пользователя): запись, добавленная в обоих, не дублируется, а заменяется.
+    """
+    result = dict(old)
+    for section in SECTIONS:
+        before = keyed(section, old.get(section) or [])
+        after = keyed(section, new.get(section) or [])
+        removed = set(diff[section]["removed"])
+        replaced = set(diff[section]["changed"]) | set(diff[section]["added"])
+        merged = [after[k] if k in replaced else rec for k, rec in before.items() if k not in removed]
+        merged.extend(after[k] for k in diff[section]["added"] if k not in before)
+        result[section] = merged
+    return result
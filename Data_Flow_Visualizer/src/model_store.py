@@ -0,0 +1,416 @@
+"""
+Хранилище модели в SQLite — необязательная замена config/data_model.yaml
+для больших моделей (settings.yaml → storage.backend: sqlite).
+
+Узлы, колонки, edges и relations лежат в своих таблицах с индексами по
+имени узла, слою/типу и концам связей; каждая запись хранится ещё и JSON-ом
+как в YAML, так что load() возвращает ту же модель (порядок записей и ключей
+сохраняется; значения, которых нет в JSON, например даты, — строками).
+Правки идут по записям в одной транзакции — файл целиком не переписывается.
+
+    python src/model_store.py import [модель.yaml|.xlsx] [--db файл]
+    python src/model_store.py export модель.yaml|.xlsx [--db файл]
+"""
+import argparse
+import contextlib
+import json
+import pathlib
+import sqlite3
+import sys
+import uuid
+
+import yaml
+
+BASE = pathlib.Path(__file__).resolve().parent.parent  # корень проекта
+if str(BASE) not in sys.path:
+    sys.path.insert(0, str(BASE))  # запуск как скрипта: python src/model_store.py
+
+from src.build_cache import content_hash  # noqa: E402
+from src.file_safety import atomic_write  # noqa: E402
+from src.model import text  # noqa: E402
+from src.model_diff import SECTIONS, keyed, record_key  # noqa: E402
+from src.snapshot import YAML_DUMPER, load_yaml  # noqa: E402
+from src.subgraph import extract  # noqa: E402
+
+SCHEMA_VERSION = 1
+DEFAULT_DB = BASE / "config" / "data_model.sqlite"
+IN_LIMIT = 500  # имён в одном "IN (...)" — ниже лимита параметров SQLite
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS nodes (
+    id INTEGER PRIMARY KEY,
+    pos INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    layer TEXT NOT NULL,
+    type TEXT NOT NULL,
+    has_columns INTEGER NOT NULL,  -- 1: в записи есть список columns (строки — в таблице columns)
+    record TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS nodes_name ON nodes (name);
+CREATE INDEX IF NOT EXISTS nodes_layer_type ON nodes (layer, type);
+CREATE INDEX IF NOT EXISTS nodes_pos ON nodes (pos);
+CREATE TABLE IF NOT EXISTS columns (
+    node_id INTEGER NOT NULL REFERENCES nodes (id) ON DELETE CASCADE,
+    pos INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    record TEXT NOT NULL,
+    PRIMARY KEY (node_id, pos)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS columns_name ON columns (name);
+CREATE TABLE IF NOT EXISTS edges (
+    id INTEGER PRIMARY KEY,
+    pos INTEGER NOT NULL,
+    source TEXT NOT NULL,
+    target TEXT NOT NULL,
+    transfer_type TEXT NOT NULL,
+    data_type TEXT NOT NULL,
+    record TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS edges_source ON edges (source, target, transfer_type, data_type);
+CREATE INDEX IF NOT EXISTS edges_target ON edges (target);
+CREATE INDEX IF NOT EXISTS edges_pos ON edges (pos);
+CREATE TABLE IF NOT EXISTS relations (
+    id INTEGER PRIMARY KEY,
+    pos INTEGER NOT NULL,
+    source TEXT NOT NULL,
+    target TEXT NOT NULL,
+    connection TEXT NOT NULL,
+    record TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS relations_source ON relations (source, target, connection);
+CREATE INDEX IF NOT EXISTS relations_target ON relations (target);
+CREATE INDEX IF NOT EXISTS relations_pos ON relations (pos);
+"""
+
+# колонки ключа записи (src.model_diff.record_key) по разделам
+KEY_COLUMNS = {
+    "nodes": ("name",),
+    "edges": ("source", "target", "transfer_type", "data_type"),
+    "relations": ("source", "target", "connection"),
+}
+
+# прочитанные модели по файлу базы: (хэш ревизии, модель) — повторный load() без изменений
+# бесплатен; отданную модель не изменять (model_diff.apply_diff строит новую)
+_loaded = {}
+
+
+def _dump(value) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def _chunks(names):
+    names = list(names)
+    for start in range(0, len(names), IN_LIMIT):
+        yield names[start:start + IN_LIMIT]
+
+
+def sqlite_path(settings: dict):
+    """Файл базы, если settings.storage.backend = sqlite (путь — от корня проекта), иначе None."""
+    storage = (settings or {}).get("storage") or {}
+    if storage.get("backend", "yaml") != "sqlite":
+        return None
+    return BASE / storage.get("sqlite", DEFAULT_DB.relative_to(BASE))
+
+
+class ModelStore:
+    """
+    Соединение с базой модели; открывается на время работы (with ModelStore(path) as store).
+    Соединение не делится между потоками — каждому потоку своё.
+    """
+
+    def __init__(self, path=DEFAULT_DB):
+        self.path = pathlib.Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(self.path, isolation_level=None, timeout=30)
+        self.db.execute("PRAGMA journal_mode = WAL")  # читатели не ждут записи
+        self.db.execute("PRAGMA synchronous = NORMAL")
+        self.db.execute("PRAGMA foreign_keys = ON")
+        self.db.executescript(SCHEMA)  # IF NOT EXISTS — повторный запуск ничего не меняет
+        with self._write(bump=False):
+            version = self._meta("schema")
+            if version is None:
+                self._set_meta("schema", SCHEMA_VERSION)
+                self._set_meta("generation", uuid.uuid4().hex)  # база пересоздана — другие хэши
+                self._set_meta("revision", 0)
+            elif int(version) != SCHEMA_VERSION:
+                raise ValueError(f"Неподдерживаемая версия схемы {self.path.name}: {version}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.db.close()
+
+    # --------- Служебное ---------
+    def _meta(self, key):
+        row = self.db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key, value):
+        self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    @contextlib.contextmanager
+    def _write(self, bump=True):
+        """Транзакция записи (BEGIN IMMEDIATE — сразу берёт блокировку); bump — новая ревизия модели."""
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+            if bump:
+                self._set_meta("revision", int(self._meta("revision")) + 1)
+            self.db.execute("COMMIT")
+        except BaseException:
+            self.db.execute("ROLLBACK")
+            raise
+
+    def model_hash(self) -> str:
+        """Ключ версии модели для кэша сборки — без чтения таблиц (поколение базы + номер ревизии)."""
+        return content_hash("sqlite", self._meta("generation"), self._meta("revision"))
+
+    # --------- Запись ---------
+    def _next_pos(self, section: str) -> int:
+        return self.db.execute(f"SELECT COALESCE(MAX(pos), -1) + 1 FROM {section}").fetchone()[0]
+
+    def _insert(self, section: str, rec: dict, pos: int):
+        key = record_key(section, rec)
+        if section == "nodes":
+            columns = rec.get("columns")
+            has_columns = isinstance(columns, list)
+            stored = dict(rec, columns=None) if has_columns else rec  # место ключа columns сохраняется
+            node_id = self.db.execute(
+                "INSERT INTO nodes (pos, name, layer, type, has_columns, record) VALUES (?, ?, ?, ?, ?, ?)",
+                (pos, key, text(rec.get("layer")), text(rec.get("type")), has_columns, _dump(stored)),
+            ).lastrowid
+            if has_columns:
+                self.db.executemany(
+                    "INSERT INTO columns (node_id, pos, name, record) VALUES (?, ?, ?, ?)",
+                    ((node_id, k, text(col.get("name")) if isinstance(col, dict) else "", _dump(col))
+                     for k, col in enumerate(columns)),
+                )
+        else:
+            names = ", ".join(KEY_COLUMNS[section])
+            marks = ", ".join("?" * len(key))
+            self.db.execute(
+                f"INSERT INTO {section} (pos, {names}, record) VALUES (?, {marks}, ?)",
+                (pos, *key, _dump(rec)),
+            )
+
+    def _find(self, section: str, key):
+        """(id, pos) записи по ключу из model_diff (с номером вхождения для повторов) или None."""
+        width = len(KEY_COLUMNS[section])
+        if section == "nodes":
+            key, n = (key,), 0
+        else:
+            key, n = key[:width], (key[width] if len(key) > width else 0)
+        where = " AND ".join(f"{c} = ?" for c in KEY_COLUMNS[section])
+        return self.db.execute(
+            f"SELECT id, pos FROM {section} WHERE {where} ORDER BY pos LIMIT 1 OFFSET ?", (*key, n)
+        ).fetchone()
+
+    def replace(self, data_model: dict):
+        """Полная загрузка модели (импорт из YAML / Excel) одной транзакцией."""
+        with self._write():
+            for section in ("columns", *SECTIONS):
+                self.db.execute(f"DELETE FROM {section}")
+            for section in SECTIONS:
+                for pos, rec in enumerate(data_model.get(section) or ()):
+                    self._insert(section, rec, pos)
+            extra = {k: v for k, v in data_model.items() if k not in SECTIONS}
+            self._set_meta("extra", _dump(extra))
+
+    def put(self, section: str, rec: dict):
+        """Добавляет или заменяет (на том же месте) запись с тем же ключом — одна транзакция."""
+        with self._write():
+            self._put(section, record_key(section, rec), rec)
+
+    def _put(self, section, key, rec):
+        found = self._find(section, key)
+        if found is not None:
+            self.db.execute(f"DELETE FROM {section} WHERE id = ?", (found[0],))
+        self._insert(section, rec, found[1] if found is not None else self._next_pos(section))
+
+    def delete(self, section: str, key) -> bool:
+        """Удаляет запись по ключу (src.model_diff.record_key); колонки узла — каскадом."""
+        with self._write():
+            found = self._find(section, key)
+            if found is not None:
+                self.db.execute(f"DELETE FROM {section} WHERE id = ?", (found[0],))
+        return found is not None
+
+    def apply_diff(self, new: dict, diff: dict) -> int:
+        """
+        Дельта src.model_diff.diff_models поверх базы — как model_diff.apply_diff,
+        но по записям в одной транзакции: изменённые заменяются на месте,
+        удалённые удаляются, добавленные дописываются в конец (если запись уже
+        есть — заменяется). Возвращает число затронутых записей.
+        """
+        touched = 0
+        with self._write():
+            for section in SECTIONS:
+                after = keyed(section, new.get(section) or [])
+                removed, changed, added = (diff[section][kind] for kind in ("removed", "changed", "added"))
+                # записи ищутся до правок: номера вхождений повторов считаются по исходной базе
+                found = {key: self._find(section, key) for key in (*removed, *changed, *added)}
+                self.db.executemany(
+                    f"DELETE FROM {section} WHERE id = ?",
+                    ((row[0],) for row in found.values() if row is not None),
+                )
+                touched += sum(1 for key in removed if found[key] is not None)
+                for key in (*changed, *added):
+                    if found[key] is not None:
+                        self._insert(section, after[key], found[key][1])  # на прежнее место
+                    elif key in added:
+                        self._insert(section, after[key], self._next_pos(section))
+                    else:
+                        continue  # изменённой записи уже нет — её удалила другая правка
+                    touched += 1
+        return touched
+
+    # --------- Чтение ---------
+    def _nodes(self, where="", params=()) -> list:
+        """Узлы (по порядку модели) с колонками; where — условие на таблицу nodes."""
+        columns = {}
+        subset = f" WHERE node_id IN (SELECT id FROM nodes {where})" if where else ""
+        for node_id, record in self.db.execute(f"SELECT node_id, record FROM columns{subset} ORDER BY node_id, pos", params):
+            columns.setdefault(node_id, []).append(json.loads(record))
+        nodes = []
+        for node_id, has_columns, record in self.db.execute(
+                f"SELECT id, has_columns, record FROM nodes {where} ORDER BY pos", params):
+            rec = json.loads(record)
+            if has_columns:
+                rec["columns"] = columns.get(node_id, [])
+            nodes.append(rec)
+        return nodes
+
+    def load(self) -> dict:
+        """Вся модель в виде как из YAML: {"nodes", "edges", "relations", ...}."""
+        return self.load_with_hash()[0]
+
+    def load_with_hash(self):
+        """(модель, хэш ревизии); пока ревизия не менялась, модель берётся из памяти процесса."""
+        digest = self.model_hash()
+        cached = _loaded.get(self.path.resolve())
+        if cached is not None and cached[0] == digest:
+            return cached[1], digest
+        with self._read():
+            data_model = {"nodes": self._nodes()}
+            for section in ("edges", "relations"):
+                data_model[section] = [json.loads(r) for r, in self.db.execute(f"SELECT record FROM {section} ORDER BY pos")]
+            data_model.update(json.loads(self._meta("extra") or "{}"))
+            digest = self.model_hash()
+        _loaded[self.path.resolve()] = (digest, data_model)
+        return data_model, digest
+
+    @contextlib.contextmanager
+    def _read(self):
+        """Согласованное чтение нескольких таблиц (снимок на время транзакции)."""
+        self.db.execute("BEGIN")
+        try:
+            yield
+        finally:
+            self.db.execute("COMMIT")
+
+    def node(self, name: str):
+        """Запись узла с колонками по индексу имени или None."""
+        nodes = self._nodes("WHERE name = ?", (name,))
+        return nodes[0] if nodes else None
+
+    def links(self, name: str) -> dict:
+        """{"edges", "relations"} — связи, у которых узел на одном из концов."""
+        return {
+            section: [json.loads(r) for r, in self.db.execute(
+                f"SELECT record FROM {section} WHERE source = ? OR target = ? ORDER BY pos", (name, name))]
+            for section in ("edges", "relations")
+        }
+
+    def _walk(self, root: str, depth, forward: bool) -> set:
+        """Имена в пределах depth шагов от root по edges и relations (None — вся цепочка), послойный BFS."""
+        src, dst = ("source", "target") if forward else ("target", "source")
+        seen, frontier, step = {root}, {root}, 0
+        while frontier and (depth is None or step < depth):
+            found = set()
+            for part in _chunks(frontier):
+                marks = ",".join("?" * len(part))
+                for section in ("edges", "relations"):
+                    query = f"SELECT DISTINCT {dst} FROM {section} WHERE {src} IN ({marks}) AND {src} != ''"
+                    found.update(name for name, in self.db.execute(query, part))
+            frontier = found - seen
+            seen |= frontier
+            step += 1
+        return seen
+
+    def extract(self, query) -> dict:
+        """
+        Фрагмент по src.subgraph.Query без чтения всей модели: окрестность корня
+        ищется по индексам связей, из базы читаются только её записи, дальше —
+        тот же subgraph.extract (результат совпадает с extract по полной модели).
+        """
+        if query.root is None:
+            return extract(self.load(), query)
+        with self._read():
+            names = {query.root}
+            if query.up != 0:
+                names |= self._walk(query.root, query.up, forward=False)
+            if query.down != 0:
+                names |= self._walk(query.root, query.down, forward=True)
+            self.db.execute("CREATE TEMP TABLE IF NOT EXISTS picked (name TEXT PRIMARY KEY)")
+            self.db.execute("DELETE FROM picked")
+            self.db.executemany("INSERT INTO picked (name) VALUES (?)", ((name,) for name in names))
+            picked = "IN (SELECT name FROM picked)"  # "+target" ниже — поиск по индексу только по source
+            part = {"nodes": self._nodes(f"WHERE name {picked}")}
+            for section in ("edges", "relations"):
+                part[section] = [json.loads(r) for r, in self.db.execute(
+                    f"SELECT record FROM {section} WHERE source {picked} AND +target {picked} ORDER BY pos")]
+        return extract(part, query)
+
+
+# --------- Импорт / экспорт ---------
+def import_model(source, db_path=DEFAULT_DB) -> dict:
+    """YAML или Excel (.xlsx) → база; возвращает число записей по разделам."""
+    source = pathlib.Path(source)
+    if source.suffix == ".xlsx":
+        from src.excel_io import rebuild_from_excel  # pandas/openpyxl — только для Excel
+        data_model = rebuild_from_excel(source)
+    else:
+        data_model = load_yaml(source) or {}
+    with ModelStore(db_path) as store:
+        store.replace(data_model)
+    return {section: len(data_model.get(section) or ()) for section in SECTIONS}
+
+
+def export_model(target, db_path=DEFAULT_DB):
+    """База → YAML или Excel (.xlsx), запись атомарная."""
+    target = pathlib.Path(target)
+    with ModelStore(db_path) as store:
+        data_model = store.load()
+    if target.suffix == ".xlsx":
+        from src.excel_io import make_excel  # pandas/openpyxl — только для Excel
+        data = make_excel(data_model).getvalue()
+    else:
+        data = yaml.dump(data_model, Dumper=YAML_DUMPER, allow_unicode=True, sort_keys=False)
+    atomic_write(target, data)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="SQLite-хранилище модели данных")
+    parser.add_argument("command", choices=("import", "export"))
+    parser.add_argument("file", nargs="?", type=pathlib.Path, default=BASE / "config" / "data_model.yaml",
+                        help="YAML или .xlsx (по умолчанию config/data_model.yaml)")
+    parser.add_argument("--db", type=pathlib.Path, default=DEFAULT_DB, help="файл базы")
+    args = parser.parse_args(argv)
+    if args.command == "import":
+        counts = import_model(args.file, args.db)
+        print(f"✅ {args.file.name} → {args.db.name}: " + ", ".join(f"{k} {v}" for k, v in counts.items()))
+    else:
+        export_model(args.file, args.db)
+        print(f"✅ {args.db.name} → {args.file}")
+
+
+if __name__ == "__main__":
+    main()
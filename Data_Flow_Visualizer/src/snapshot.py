@@ -0,0 +1,150 @@
+"""
+Бинарные снимки YAML-конфигов для быстрого старта.
+
+Рядом с config/data_model.yaml хранится .data_model.yaml.snapshot — pickle
+с уже разобранной моделью. Снимок действителен, пока совпадают mtime и
+размер YAML; если mtime изменился, сверяется SHA-256 содержимого, и
+только при реальном изменении YAML разбирается заново (C-загрузчиком
+PyYAML, если он доступен). Снимок читается ограниченным unpickler-ом:
+только встроенные контейнеры и скаляры плюс даты/время — те же типы, что
+даёт SafeLoader, — поэтому подложенный файл не может выполнить код.
+
+Запуск как скрипта компилирует снимки заранее:
+    python src/snapshot.py [файлы.yaml ...]
+"""
+import datetime
+import hashlib
+import os
+import pathlib
+import pickle
+import sys
+import tempfile
+
+import yaml
+
+SNAPSHOT_VERSION = 1
+# libyaml-загрузчик в разы быстрее чистого Python; есть не во всех сборках PyYAML
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+YAML_DUMPER = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+
+# классы, которые нужны для типов SafeLoader (!!timestamp); остальное — встроенные опкоды pickle
+SAFE_CLASSES = {
+    ("datetime", "date"): datetime.date,
+    ("datetime", "datetime"): datetime.datetime,
+    ("datetime", "timezone"): datetime.timezone,
+    ("datetime", "timedelta"): datetime.timedelta,
+}
+
+
+class SafeUnpickler(pickle.Unpickler):
+    """Unpickler без импорта произвольных классов: снимок не может выполнить код."""
+
+    def find_class(self, module, name):
+        try:
+            return SAFE_CLASSES[(module, name)]
+        except KeyError:
+            raise pickle.UnpicklingError(f"Недопустимый класс в снимке: {module}.{name}") from None
+
+
+def snapshot_path(path) -> pathlib.Path:
+    path = pathlib.Path(path)
+    return path.with_name(f".{path.name}.snapshot")
+
+
+def parse_yaml(raw: bytes):
+    return yaml.load(raw, Loader=YAML_LOADER)
+
+
+def _read_snapshot(snap: pathlib.Path, header_only=False):
+    """(header, data) или (None, None), если снимка нет или он битый/старого формата; header_only — data=None."""
+    try:
+        with open(snap, "rb") as f:
+            unpickler = SafeUnpickler(f)
+            header = unpickler.load()
+            if not isinstance(header, dict) or header.get("version") != SNAPSHOT_VERSION:
+                return None, None
+            return header, None if header_only else unpickler.load()
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ValueError, TypeError):
+        return None, None
+
+
+def _write_snapshot(snap: pathlib.Path, header: dict, data):
+    # запись через временный файл: параллельный читатель не увидит половину снимка
+    fd, tmp = tempfile.mkstemp(dir=snap.parent, prefix=snap.name, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(header, f, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, snap)
+    except OSError:
+        pathlib.Path(tmp).unlink(missing_ok=True)
+
+
+def load_with_hash(path):
+    """Разобранный YAML и SHA-256 его содержимого (через снимок, если он актуален)."""
+    path = pathlib.Path(path)
+    snap = snapshot_path(path)
+    stat = path.stat()
+    header, data = _read_snapshot(snap)
+
+    if header and header["mtime_ns"] == stat.st_mtime_ns and header["size"] == stat.st_size:
+        return data, header["sha256"]
+
+    raw = path.read_bytes()
+    digest = hashlib.sha256(raw).hexdigest()
+    if not header or header["sha256"] != digest:
+        data = parse_yaml(raw)
+
+    header = {
+        "version": SNAPSHOT_VERSION,
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+        "sha256": digest,
+    }
+    _write_snapshot(snap, header, data)
+    return data, digest
+
+
+def file_hash(path) -> str:
+    """SHA-256 YAML без разбора: из заголовка снимка, если он актуален, иначе по содержимому."""
+    path = pathlib.Path(path)
+    stat = path.stat()
+    header, _ = _read_snapshot(snapshot_path(path), header_only=True)
+    if header and header["mtime_ns"] == stat.st_mtime_ns and header["size"] == stat.st_size:
+        return header["sha256"]
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def remember(path, data) -> str:
+    """
+    Снимок для только что записанного YAML: данные уже в памяти, заново
+    разбирать файл не нужно. Возвращает SHA-256 содержимого.
+    """
+    path = pathlib.Path(path)
+    raw = path.read_bytes()
+    stat = path.stat()
+    digest = hashlib.sha256(raw).hexdigest()
+    header = {
+        "version": SNAPSHOT_VERSION,
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+        "sha256": digest,
+    }
+    _write_snapshot(snapshot_path(path), header, data)
+    return digest
+
+
+def load_yaml(path):
+    return load_with_hash(path)[0]
+
+
+def main(paths):
+    for path in paths:
+        data, digest = load_with_hash(path)
+        print(f"✅ {snapshot_path(path).name}: {digest[:12]}")
+
+
+if __name__ == "__main__":
+    BASE = pathlib.Path(__file__).resolve().parent.parent
+    main(sys.argv[1:] or [BASE / "config" / "data_model.yaml", BASE / "config" / "settings.yaml"])
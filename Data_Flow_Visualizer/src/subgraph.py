@@ -0,0 +1,130 @@
+"""Фрагмент модели по запросу: корень с N шагами вверх/вниз и фильтры по слою, типу и видам связей."""
+from typing import NamedTuple
+
+from src.build_cache import content_hash
+from src.graph_index import GraphIndex
+
+QUERY_CACHE_LIMIT = 32  # сколько последних фрагментов держать в памяти процесса
+
+
+class Query(NamedTuple):
+    """
+    root — корневой узел; up / down — сколько шагов по связям вверх и вниз
+    (None — вся цепочка, 0 — не идти). Пустой фильтр ничего не отсекает.
+    Фильтры data_type / transfer_type применяются к связям (у relations это
+    process и 'relation'); узлы без оставшихся связей при этом убираются.
+    """
+    root: str = None
+    up: int = None
+    down: int = None
+    layers: tuple = ()
+    types: tuple = ()
+    data_types: tuple = ()
+    transfer_types: tuple = ()
+
+    def is_empty(self) -> bool:
+        return self == Query()
+
+    def slug(self) -> str:
+        """Короткий ключ запроса — для имени файла и кэша."""
+        return content_hash(list(self))[:12]
+
+
+def make_query(root=None, up=None, down=None, layers=(), types=(), data_types=(), transfer_types=()) -> Query:
+    """Query с нормализованными фильтрами: порядок и повторы значений на ключ не влияют."""
+    def norm(values):
+        return tuple(sorted({str(v) for v in values or ()}))
+
+    return Query(root or None, up, down, norm(layers), norm(types), norm(data_types), norm(transfer_types))
+
+
+def _edge_passes(query: Query, data_type: str, transfer_type: str) -> bool:
+    return (
+        (not query.data_types or data_type in query.data_types)
+        and (not query.transfer_types or transfer_type in query.transfer_types)
+    )
+
+
+def extract(data_model: dict, query: Query, index: GraphIndex = None) -> dict:
+    """
+    Подмодель {"nodes", "edges", "relations"} из тех же записей, что data_model.
+    Обход от корня идёт по индексу (edges и relations), затем применяются фильтры.
+    """
+    index = index or GraphIndex(data_model)
+    nodes = data_model.get("nodes") or []
+
+    if query.root is not None:
+        if index.node(query.root) is None:
+            raise KeyError(f"Узел не найден: {query.root}")
+        keep = {query.root}
+        if query.up != 0:
+            keep.update(index.upstream(query.root, depth=query.up, relations=True))
+        if query.down != 0:
+            keep.update(index.downstream(query.root, depth=query.down, relations=True))
+    else:
+        keep = set(index.nodes)
+    keep = {
+        name for name in keep
+        if name in index.nodes  # концы связей без узла в модели во фрагмент не попадают
+        and (not query.layers or str(index.nodes[name].get("layer", "")) in query.layers)
+        and (not query.types or str(index.nodes[name].get("type", "")) in query.types)
+    }
+
+    edges = [
+        e for e in data_model.get("edges") or []
+        if str(e.get("from", "")) in keep and str(e.get("to", "")) in keep
+        and _edge_passes(query, str(e.get("data_type") or "general"), str(e.get("transfer_type") or "pq"))
+    ]
+    relations = [
+        r for r in data_model.get("relations") or []
+        if str(r.get("from", "")) in keep and str(r.get("to", "")) in keep
+        and _edge_passes(query, str(r.get("process") or ""), "relation")
+    ]
+    if query.data_types or query.transfer_types:
+        linked = {query.root}
+        for link in edges + relations:
+            linked.add(str(link.get("from", "")))
+            linked.add(str(link.get("to", "")))
+        keep &= linked
+
+    return {
+        "nodes": [n for n in nodes if str(n.get("name", "")) in keep],
+        "edges": edges,
+        "relations": relations,
+    }
+
+
+# --- Кэш запросов: (хэш модели, запрос) → подмодель; индекс — один на модель ---
+_results = {}
+_indexes = {}
+
+
+def cached_extract(model_hash: str, data_model: dict, query: Query) -> dict:
+    """extract() с памятью процесса: повторный запрос к той же модели бесплатен."""
+    key = (model_hash, query)
+    if key not in _results:
+        if model_hash not in _indexes:
+            _indexes.clear()  # индекс нужен только для текущей версии модели
+            _indexes[model_hash] = GraphIndex(data_model)
+        _results[key] = extract(data_model, query, _indexes[model_hash])
+        while len(_results) > QUERY_CACHE_LIMIT:
+            del _results[next(iter(_results))]
+    return _results[key]
+
+
+def vocabulary(data_model: dict) -> dict:
+    """Значения для фильтров: имена, слои и типы узлов, data_type и transfer_type связей."""
+    nodes = data_model.get("nodes") or []
+    edges = data_model.get("edges") or []
+    relations = data_model.get("relations") or []
+    return {
+        "names": sorted({str(n.get("name", "")) for n in nodes}),
+        "layers": sorted({str(n.get("layer", "")) for n in nodes}),
+        "types": sorted({str(n.get("type", "")) for n in nodes}),
+        "data_types": sorted(
+            {str(e.get("data_type") or "general") for e in edges} | {str(r.get("process") or "") for r in relations}
+        ),
+        "transfer_types": sorted(
+            {str(e.get("transfer_type") or "pq") for e in edges} | ({"relation"} if relations else set())
+        ),
+    }
@@ -0,0 +1,41 @@
+"""Индексы для страницы: словари фильтров, id связей по типам и поиск узлов по префиксам слов."""
+import re
+
+TOKEN_RE = re.compile(r"[^\W_]+")  # слова и числа; "_" — разделитель (DB_Main_1 → db, main, 1)
+
+
+def filter_vocabulary(vis_edges) -> dict:
+    """Значения data_type / transfer_type, реально встречающиеся в связях, — для чекбоксов."""
+    return {
+        "data_type": sorted({str(e.get("data_type", "")) for e in vis_edges}),
+        "transfer_type": sorted({str(e.get("transfer_type", "")) for e in vis_edges}),
+    }
+
+
+def edge_index(vis_edges) -> dict:
+    """{data_type: {transfer_type: [id связи]}} — переключение фильтра одной пачкой edges.update."""
+    index = {}
+    for e in vis_edges:
+        by_transfer = index.setdefault(str(e.get("data_type", "")), {})
+        by_transfer.setdefault(str(e.get("transfer_type", "")), []).append(e["id"])
+    return index
+
+
+def search_index(nodes, clusters=None) -> dict:
+    """
+    Поиск по словам имени и комментария узла (src.model.Node):
+    tokens — отсортированные слова в нижнем регистре, postings[i] — номера
+    узлов в ids, где встречается tokens[i]. Префиксный поиск в браузере —
+    бинарный поиск по tokens. clusters (режим overview) — кластер каждого
+    узла из ids, чтобы раскрыть его перед фокусом.
+    """
+    ids, postings = [], {}
+    for k, n in enumerate(nodes):
+        ids.append(n.name)
+        for token in set(TOKEN_RE.findall(f"{n.name} {n.comment}".lower())):
+            postings.setdefault(token, []).append(k)
+    tokens = sorted(postings)
+    index = {"ids": ids, "tokens": tokens, "postings": [postings[t] for t in tokens]}
+    if clusters is not None:
+        index["clusters"] = [clusters.get(name) for name in ids]
+    return index
@@ -0,0 +1,127 @@
+"""
+Режим наблюдения: пересборка HTML при изменении модели, настроек или шаблона.
+
+    python src/watch.py                       # config/data_model.yaml → build/data_model_v1.html
+    python src/watch.py --models-dir models/  # все модели каталога → build/<имя>.html
+
+Файлы опрашиваются по mtime/размеру; серия сохранений схлопывается
+(debounce), пересобираются только затронутые модели. Разобранные модели
+и раскладки держатся в памяти процесса между пересборками.
+"""
+import argparse
+import pathlib
+import sys
+import time
+
+BASE = pathlib.Path(__file__).resolve().parent.parent
+if str(BASE) not in sys.path:
+    sys.path.insert(0, str(BASE))
+
+from src import generate_html  # noqa: E402
+from src.snapshot import load_with_hash  # noqa: E402
+
+
+def file_state(path: pathlib.Path):
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+class Watcher:
+    def __init__(self, jobs_source, settings_path=generate_html.SETTINGS_FILE, template=generate_html.TEMPLATE,
+                 interval=0.25, debounce=0.3):
+        """
+        jobs_source — функция без аргументов, возвращающая [{"model", "output"}];
+        вызывается на каждом опросе, чтобы подхватывать новые файлы моделей.
+        """
+        self.jobs_source = jobs_source
+        self.settings_path = pathlib.Path(settings_path)
+        self.template = pathlib.Path(template)
+        self.interval = interval
+        self.debounce = debounce
+        self.states = {}
+        self.models = {}   # путь модели → (модель, хэш)
+        self.settings = None
+
+    def poll(self) -> set:
+        """Пути, чьё состояние изменилось с прошлого опроса (включая появление/удаление)."""
+        jobs = self.jobs_source()
+        paths = [self.settings_path, self.template] + [pathlib.Path(j["model"]) for j in jobs]
+        changed = set()
+        for path in paths:
+            state = file_state(path)
+            if self.states.get(path, "new") != state:
+                self.states[path] = state
+                changed.add(path)
+        return changed
+
+    def rebuild(self, changed: set, force=False):
+        jobs = self.jobs_source()
+        if self.settings is None or self.settings_path in changed:
+            self.settings = generate_html.load_settings(self.settings_path)
+        everything = force or self.settings_path in changed or self.template in changed
+        for job in jobs:
+            model_path = pathlib.Path(job["model"])
+            if not everything and model_path not in changed:
+                continue
+            if file_state(model_path) is None:
+                self.models.pop(model_path, None)
+                continue
+            start = time.perf_counter()
+            try:
+                if model_path in changed or model_path not in self.models:
+                    self.models[model_path] = load_with_hash(model_path)
+                data_model, model_hash = self.models[model_path]
+                rebuilt = generate_html.build(data_model or {}, self.settings, output=job["output"],
+                                              template=self.template, model_hash=model_hash)
+            except Exception as e:
+                print(f"❌ {model_path.name}: {type(e).__name__}: {e}")
+                continue
+            elapsed = time.perf_counter() - start
+            if rebuilt:
+                print(f"🔁 {model_path.name} → {pathlib.Path(job['output']).name} за {elapsed:.2f} с")
+            else:
+                print(f"⏭️ {model_path.name}: без изменений")
+
+    def run(self):
+        self.poll()
+        self.rebuild(set(), force=True)
+        print(f"👀 Наблюдение за изменениями (опрос {self.interval} с, Ctrl+C — выход)...")
+        pending, last_change = set(), 0.0
+        while True:
+            changed = self.poll()
+            now = time.monotonic()
+            if changed:
+                pending |= changed
+                last_change = now
+            elif pending and now - last_change >= self.debounce:
+                self.rebuild(pending)
+                pending = set()
+            time.sleep(self.interval)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Пересборка HTML при изменении модели, настроек или шаблона")
+    parser.add_argument("--models-dir", type=pathlib.Path, help="наблюдать за всеми моделями каталога")
+    parser.add_argument("--out-dir", type=pathlib.Path, default=generate_html.OUTPUT.parent)
+    parser.add_argument("--interval", type=float, default=0.25, help="период опроса, с")
+    parser.add_argument("--debounce", type=float, default=0.3, help="пауза после последнего сохранения, с")
+    args = parser.parse_args(argv)
+
+    if args.models_dir:
+        def jobs_source():
+            return generate_html.discover_models(args.models_dir, args.out_dir)
+    else:
+        def jobs_source():
+            return [{"model": generate_html.YAML_FILE, "output": generate_html.OUTPUT}]
+
+    try:
+        Watcher(jobs_source, interval=args.interval, debounce=args.debounce).run()
+    except KeyboardInterrupt:
+        print("\n🛑 Остановлено.")
+
+
+if __name__ == "__main__":
+    main()
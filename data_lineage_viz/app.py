@@ -1,20 +1,14 @@
 import streamlit as st
-import yaml
 import pandas as pd
 from pyvis.network import Network
-import tempfile
-import os
-import uuid
+import pathlib
+import sys
 
-# ---------- Загрузка модели ----------
-@st.cache_data
-def load_model(path="data_model.yaml"):
-    with open(path, "r", encoding="utf-8") as f:
-        return yaml.safe_load(f)
-
-model = load_model()
-nodes = model["nodes"]
-edges = model["edges"]
+# общий индекс графа живёт в Data_Flow_Visualizer/src
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent / "Data_Flow_Visualizer"))
+from src.graph_index import GraphIndex  # noqa: E402
+from src.layout import compute_layout  # noqa: E402
+from src.snapshot import load_with_hash  # noqa: E402
 
 layer_colors = {
     "SharePoint": "#FFD580",
@@ -22,6 +16,47 @@ layer_colors = {
     "Output": "#58D68D"
 }
 
+
+# ---------- Загрузка модели ----------
+# всё, что ниже, кэшируется по SHA-256 YAML: новый ключ появляется только при правке файла
+def load_model(path="data_model.yaml"):
+    """(модель, SHA-256) — через бинарный снимок, на rerun YAML не разбирается."""
+    return load_with_hash(path)
+
+
+@st.cache_resource(max_entries=2)
+def load_index(model_hash, _model):
+    """Индекс строится один раз на модель и переживает rerun-ы."""
+    return GraphIndex(_model)
+
+
+@st.cache_data(max_entries=2, show_spinner=False)
+def graph_html(model_hash, _model, _index):
+    """
+    HTML графа pyvis, собранный в памяти (без временных файлов).
+    Координаты считаются заранее по слоям (в порядке layer_colors), physics выключен — браузер
+    не раскладывает граф заново при каждом показе.
+    """
+    positions = compute_layout(
+        [(name, str(n.get("layer", ""))) for name, n in _index.nodes.items()],
+        [(src, str(link["to"])) for src, links in _index.out_edges.items() for link in links],
+        order=list(layer_colors),
+    )
+    net = Network(height="750px", width="100%", bgcolor="#202225", font_color="white", directed=True)
+    for name, node in _index.nodes.items():
+        x, y = positions[name]
+        net.add_node(name, label=name, color=layer_colors.get(node["layer"], "#AAAAAA"), x=x, y=y)
+    for src, links in _index.out_edges.items():
+        for link in links:
+            net.add_edge(src, link["to"], color="#AAAAAA")
+    net.toggle_physics(False)
+    return net.generate_html()
+
+
+model, model_hash = load_model()
+index = load_index(model_hash, model)
+nodes = model["nodes"]
+
 # ---------- Конфигурация ----------
 st.set_page_config(page_title="Data Lineage Visualizer", layout="wide")
 st.title("📊 Data Model & Lineage Viewer (упрощённый)")
@@ -36,20 +71,8 @@ left, right = st.columns([2, 1])
 with left:
     st.markdown("### 🔗 Взаимосвязи таблиц")
 
-    # создаём граф
-    net = Network(height="750px", width="100%", bgcolor="#202225", font_color="white", directed=True)
-    for node in nodes:
-        color = layer_colors.get(node["layer"], "#AAAAAA")
-        net.add_node(node["name"], label=node["name"], color=color)
-    for e in edges:
-        net.add_edge(e["from"], e["to"], color="#AAAAAA")
-
-    tmp_path = os.path.join(tempfile.gettempdir(), f"graph_{uuid.uuid4().hex}.html")
-    net.save_graph(tmp_path)
-
-    with open(tmp_path, "r", encoding="utf-8") as f:
-        html_code = f.read()
-    st.components.v1.html(html_code, height=750, scrolling=True)
+    # граф берётся из кэша: выбор узла и кнопки меняют только правую панель
+    st.components.v1.html(graph_html(model_hash, model, index), height=750, scrolling=True)
 
     # список для выбора узла (здесь реальное взаимодействие)
     st.markdown("### 🧭 Выбор таблицы")
@@ -65,7 +88,7 @@ with right:
     if not node_name:
         st.info("Выбери таблицу и нажми «Показать детали»")
     else:
-        node = next((n for n in nodes if n["name"] == node_name), None)
+        node = index.node(node_name)
         if node:
             st.subheader(node["name"])
             st.markdown(f"**Уровень:** {node['layer']}")
@@ -86,9 +109,13 @@ with right:
                 st.write("Нет данных о колонках")
 
             st.markdown("**Входящие связи:**")
-            incoming = [e["from"] for e in edges if e["to"] == node_name]
-            st.write(incoming or "-")
+            st.write(index.predecessors(node_name) or "-")
 
             st.markdown("**Исходящие связи:**")
-            outgoing = [e["to"] for e in edges if e["from"] == node_name]
-            st.write(outgoing or "-")
+            st.write(index.successors(node_name) or "-")
+
+            st.markdown("**Все источники (upstream):**")
+            st.write(list(index.upstream(node_name)) or "-")
+
+            st.markdown("**Все потребители (downstream):**")
+            st.write(list(index.downstream(node_name)) or "-")
@@ -1,4 +1,9 @@
-import json, yaml, pathlib
+import json, pathlib, sys
+
+# общая модель живёт в Data_Flow_Visualizer/src
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent / "Data_Flow_Visualizer"))
+from src.model import Model, StyleTable  # noqa: E402
+from src.snapshot import load_yaml  # noqa: E402
 
 TEMPLATE = "html_template.html"
 YAML_FILE = "data_model.yaml"
@@ -6,13 +11,12 @@ OUTPUT = "data_model.html"
 
 def main():
     tpl = pathlib.Path(TEMPLATE).read_text(encoding="utf-8")
-    model = yaml.safe_load(pathlib.Path(YAML_FILE).read_text(encoding="utf-8"))
-
-    nodes_in = model.get("nodes", [])
-    edges_in = model.get("edges", [])
+    model = Model(load_yaml(YAML_FILE) or {})
+    for problem in model.problems:
+        print(f"⚠️ {problem}")
 
-    node_data = {n["name"]: {"layer": n.get("layer",""), "type": n.get("type",""), "comment": n.get("comment","")} for n in nodes_in}
-    vis_nodes = [{"id": n["name"], "label": f"{n['name']}\n({n.get('layer','')})", "group": n.get("layer","")} for n in nodes_in]
+    node_data = {n.name: {"layer": n.layer, "type": n.type, "comment": n.comment} for n in model.nodes}
+    vis_nodes = [{"id": n.name, "label": f"{n.name}\n({n.layer})", "group": n.layer} for n in model.nodes]
 
     # Тип линии (форма)
     style_map = {
@@ -33,21 +37,22 @@ def main():
         "general":    "#cfcfcf",
     }
 
+    styles = StyleTable(color_map, style_map, color_map["general"], style_map["default"])
+
     vis_edges = []
-    for i, e in enumerate(edges_in):
-        t_type = e.get("transfer_type", "default")
-        d_type = e.get("data_type", "general")
-        s = style_map.get(t_type, style_map["default"])
-        color = color_map.get(d_type, color_map["general"])
+    for i, e in enumerate(model.edges):
+        t_type = e.transfer_type or "default"
+        d_type = e.data_type or "general"
+        color, dashes = styles.resolve(d_type, t_type)
         vis_edges.append({
-            "id": f"edge_{i}_{e['from']}_{e['to']}",
-            "from": e["from"],
-            "to": e["to"],
-            "transfer": e.get("transfer", []),
+            "id": f"edge_{i}_{e.source}_{e.target}",
+            "from": e.source,
+            "to": e.target,
+            "transfer": e.transfer,
             "transfer_type": t_type,
             "data_type": d_type,
-            "color": f"rgba({int(color[1:3],16)}, {int(color[3:5],16)}, {int(color[5:7],16)}, {s['opacity']})",
-            "dashes": s["dashes"],
+            "color": color,
+            "dashes": dashes,
             "arrows": {"to": {"enabled": True, "type": "arrow", "scaleFactor": 0.8}},
             "length": 250
         })